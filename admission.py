@@ -0,0 +1,190 @@
+import functools
+import math
+import threading
+import time
+
+from flask import jsonify
+from flask_jwt_extended import get_jwt_identity
+
+from config import app
+
+
+class TokenBucket:
+    """Allows ``rate`` calls per second on average, in bursts of ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, now):
+        """Spend a token. Returns 0 on success, otherwise the seconds until
+        one is available."""
+        wait = self.wait(now)
+        if not wait:
+            self.tokens -= 1
+        return wait
+
+    def wait(self, now):
+        """Seconds until a token is available, 0 if one is now"""
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self, now):
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """Per-key token buckets kept in process memory.
+
+    Buckets that have refilled completely carry no state worth keeping, so
+    they are dropped whenever the table grows past ``max_keys``."""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.rejected = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def check(self, key):
+        """Returns 0 if ``key`` may proceed, otherwise seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            wait = bucket.take(now)
+            if wait:
+                self.rejected += 1
+            return wait
+
+    def retry_after(self, key):
+        """Like ``check`` but without spending a token, for limits that only
+        charge some outcomes (e.g. failed logins)."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            return bucket.wait(now) if bucket is not None else 0
+
+    def _prune(self, now):
+        for key in [k for k, b in self._buckets.items() if b.is_full(now)]:
+            del self._buckets[key]
+
+    def stats(self):
+        with self._lock:
+            return {"tracked_keys": len(self._buckets), "rejected": self.rejected}
+
+
+class AdmissionLimiter:
+    """Runs at most ``max_concurrent`` calls at once; up to ``max_queue`` more
+    wait up to ``queue_timeout`` seconds for a slot and the rest are turned
+    away immediately, so a burst cannot take every worker thread."""
+
+    def __init__(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        # Moving average of how long a slot is held, for Retry-After
+        self.average_seconds = 1.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    self.rejected_queue_full += 1
+                    return False
+                self.waiting += 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self.active < self.max_concurrent, self.queue_timeout
+                    )
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    self.rejected_timeout += 1
+                    return False
+            self.active += 1
+            self.admitted += 1
+            return True
+
+    def release(self, duration):
+        with self._condition:
+            self.active -= 1
+            self.average_seconds += 0.2 * (duration - self.average_seconds)
+            self._condition.notify()
+
+    def retry_after(self):
+        """Rough seconds until the queue has drained, at least 1"""
+        with self._condition:
+            backlog = self.waiting + self.active + 1
+            rounds = backlog / self.max_concurrent
+            return max(1, math.ceil(rounds * self.average_seconds))
+
+    def stats(self):
+        with self._condition:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout,
+                "average_seconds": round(self.average_seconds, 3),
+            }
+
+
+detection_limiter = AdmissionLimiter(
+    app.config["DETECTION_MAX_CONCURRENT"],
+    app.config["DETECTION_MAX_QUEUE"],
+    app.config["DETECTION_QUEUE_TIMEOUT_SECONDS"],
+)
+detection_rate_limiter = RateLimiter(
+    app.config["DETECTION_RATE_PER_MINUTE"] / 60, app.config["DETECTION_BURST"]
+)
+
+
+def admission_controlled(limiter, rate_limiter=None):
+    """Rate limit the view per user (429) and run it under ``limiter`` (503).
+    Both rejections carry Retry-After. Goes below the auth decorator."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if rate_limiter is not None:
+                wait = rate_limiter.check(get_jwt_identity())
+                if wait:
+                    response = jsonify({"error": "Too many requests, slow down"})
+                    response.headers["Retry-After"] = str(math.ceil(wait))
+                    return response, 429
+
+            if not limiter.acquire():
+                response = jsonify({"error": "Server busy, try again shortly"})
+                response.headers["Retry-After"] = str(limiter.retry_after())
+                return response, 503
+
+            started = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                limiter.release(time.monotonic() - started)
+
+        return wrapper
+
+    return decorator
@@ -1,10 +1,15 @@
 import cv2
 import numpy as np
 import os
+import time
 
-import cv2
-import numpy as np
-import os
+
+def _lap(timings, stage, started):
+    """Record the time since ``started`` as ``stage`` and return the time now"""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = now - started
+    return now
 
 
 class ObjectDetector:
@@ -76,7 +81,12 @@ class ObjectDetector:
             f"Model loaded successfully with {len(self.classes)} classes. Output layers: {self.output_layers}"
         )
 
-    def detect(self, image_path, confidence_threshold=0.5, nms_threshold=0.4):
+    def detect(
+        self, image_path, confidence_threshold=0.5, nms_threshold=0.4, timings=None
+    ):
+        """Detect objects in an image. Stage durations in seconds are stored
+        in ``timings`` when a dict is passed."""
+        started = time.perf_counter()
         image = cv2.imread(image_path)
         if image is None:
             raise ValueError(f"Could not read image at {image_path}")
@@ -87,11 +97,14 @@ class ObjectDetector:
             image, 1 / 255.0, (416, 416), swapRB=True, crop=False
         )
 
+        started = _lap(timings, "preprocess", started)
+
         self.net.setInput(blob)
         try:
             outputs = self.net.forward(self.output_layers)
         except cv2.error as e:
             raise RuntimeError(f"Error during model forward pass: {e}")
+        started = _lap(timings, "forward", started)
 
         class_ids = []
         confidences = []
@@ -115,6 +128,8 @@ class ObjectDetector:
                     boxes.append([x, y, w, h])
                     confidences.append(float(confidence))
                     class_ids.append(class_id)
+        started = _lap(timings, "decode", started)
+
         indices = cv2.dnn.NMSBoxes(
             boxes, confidences, confidence_threshold, nms_threshold
         )
@@ -140,10 +155,12 @@ class ObjectDetector:
                         "box": [x, y, w, h],
                     }
                 )
+        _lap(timings, "nms", started)
 
         return results
 
-    def annotate_image(self, image_path, output_path, detections):
+    def annotate_image(self, image_path, output_path, detections, timings=None):
+        started = time.perf_counter()
         image = cv2.imread(image_path)
         if image is None:
             print(f"Warning: Could not read image {image_path} for annotation.")
@@ -198,5 +215,6 @@ class ObjectDetector:
         except Exception as e:
             print(f"Error writing annotated image to {output_path}: {e}")
             return None
+        _lap(timings, "annotate", started)
 
         return output_path
@@ -5,6 +5,7 @@ import uuid
 import time
 import glob
 from config import db
+from metrics import observe_detection
 from .model import ObjectDetector
 
 UPLOAD_FOLDER = "uploads"
@@ -76,11 +77,17 @@ def process_image():
             confidence_threshold = float(
                 request.headers.get("X-Confidence-Threshold", 0.5)
             )
-            detections = detector.detect(filepath, confidence_threshold)
+            timings = {}
+            detections = detector.detect(
+                filepath, confidence_threshold, timings=timings
+            )
 
             result_filename = f"result_{unique_filename}"
             result_path = os.path.join(RESULT_FOLDER, result_filename)
-            annotated_path = detector.annotate_image(filepath, result_path, detections)
+            annotated_path = detector.annotate_image(
+                filepath, result_path, detections, timings=timings
+            )
+            observe_detection(timings)
 
             print(f"Created annotated image at: {result_path}")
             print(f"File exists after creation: {os.path.exists(result_path)}")
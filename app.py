@@ -1,11 +1,31 @@
+import datetime
+import time
+
+_startup_started = time.perf_counter()
+
 from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import app, db
 from routes import api_routes
 from auth import auth_routes
-from models import create_tables
+from models import (
+    SCHEMA_VERSION,
+    check_category_stats,
+    get_schema_version,
+    migrate,
+    rebuild_category_stats,
+    rebuild_transaction_daily,
+)
+import auth
+import compression
+import database
+import json_provider
+import metrics
+import profiling
+import revocation
 import os
+import threading
 
 CORS(app, 
      origins=[
@@ -16,31 +36,107 @@ CORS(app,
          "https://www.onlyschool.id.lv"
      ],
      methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-     allow_headers=['Content-Type', 'Authorization'],
+     allow_headers=['Content-Type', 'Authorization', 'X-Profile'],
+     # Read by the dashboard: saved profile ids and when to retry a 429/503
+     expose_headers=['X-Profile-Id', 'Retry-After'],
      supports_credentials=True
 )
 
 app.config["JWT_TOKEN_LOCATION"] = ["headers"]
+# Only /api/stream/changes also reads ?token=, since EventSource sends no headers
+app.config["JWT_QUERY_STRING_NAME"] = "token"
 app.config["JWT_COOKIE_SECURE"] = False
 app.config["JWT_COOKIE_CSRF_PROTECT"] = False
+# Access tokens stay short-lived; clients renew them at /api/token/refresh
+app.config["JWT_ACCESS_TOKEN_EXPIRES"] = datetime.timedelta(
+    minutes=int(os.environ.get("JWT_ACCESS_TOKEN_MINUTES", 15))
+)
+app.config["JWT_REFRESH_TOKEN_EXPIRES"] = datetime.timedelta(
+    days=int(os.environ.get("JWT_REFRESH_TOKEN_DAYS", 7))
+)
 
 app.config["JWT_SECRET_KEY"] = os.environ.get(
     "JWT_SECRET_KEY", "24dbdf01c1042bf4d7e55a223ef8fd479a6964308c1fd491d092172fe062c8b2"
 )
 
 jwt = JWTManager(app)
+auth.init_app(jwt)
+revocation.init_app(jwt)
+
+database.init_app(app)
+compression.init_app(app)
+json_provider.init_app(app)
+metrics.init_app(app)
+profiling.init_app(app)
 
 app.register_blueprint(api_routes)
 app.register_blueprint(auth_routes)
 
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Create or upgrade the database schema."""
+    applied = migrate()
+    if applied:
+        print(f"Applied schema migrations: {applied}")
+    else:
+        print(f"Database schema is up to date (version {SCHEMA_VERSION}).")
+
+
+@app.cli.command("rebuild-category-stats")
+def rebuild_category_stats_command():
+    """Check category_stats against a full recount and rebuild it."""
+    cursor = db.connection.cursor()
+    mismatches = check_category_stats(cursor)
+    for category_id, stored, actual in mismatches:
+        print(f"Category {category_id}: stored {stored}, actual {actual}")
+    print(f"{len(mismatches)} categories out of date, rebuilding...")
+    rebuild_category_stats(cursor)
+    print("category_stats rebuilt.")
+
+
+@app.cli.command("backfill-transaction-daily")
+def backfill_transaction_daily_command():
+    """Rebuild the transaction_daily rollup from the transactions ledger."""
+    started = time.perf_counter()
+    rebuild_transaction_daily()
+    print(f"transaction_daily rebuilt in {time.perf_counter() - started:.1f} s.")
+
+
 with app.app_context():
     try:
-        print("Attempting to initialize database schema...")
-        create_tables()
-        print("Database schema check/creation complete.")
+        schema_version = get_schema_version()
+        if schema_version >= SCHEMA_VERSION:
+            print(f"Database schema is current (version {schema_version}).")
+        elif os.environ.get("AUTO_MIGRATE"):
+            print(f"Database schema is at version {schema_version}, migrating...")
+            migrate()
+        else:
+            print(
+                f"WARNING: Database schema is at version {schema_version}, "
+                f"expected {SCHEMA_VERSION}. Run `flask --app app migrate`."
+            )
     except Exception as e:
         print(f"WARNING: Database error: {e}")
 
+
+def prewarm_imports():
+    """Load the report exporters and the AI stack ahead of first use."""
+    started = time.perf_counter()
+    try:
+        import exporters
+        import ai.process
+    except Exception as e:
+        print(f"WARNING: Pre-warming imports failed: {e}")
+        return
+    print(f"Pre-warmed heavy imports in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if os.environ.get("PREWARM_IMPORTS"):
+    threading.Thread(target=prewarm_imports, daemon=True).start()
+
+print(f"Startup finished in {(time.perf_counter() - _startup_started) * 1000:.0f} ms")
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -1,7 +1,29 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import check_password_hash
+from flask_jwt_extended import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_jwt,
+    get_jwt_identity,
+    jwt_required,
+)
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+import math
 from config import db
+from revocation import revoke_token
+from passwords import (
+    PasswordHashBusy,
+    busy_response,
+    hash_password,
+    login_retry_after,
+    needs_rehash,
+    record_failed_login,
+    verify_password,
+)
+
+# Scope claim of the short-lived tokens issued by /api/stream/token
+STREAM_SCOPE = "stream"
 
 # Create a blueprint for authentication routes
 auth_routes = Blueprint("auth_routes", __name__)
@@ -13,6 +35,13 @@ def login():
         data = request.json
         username = data.get("username")
         password = data.get("password")
+        ip = request.remote_addr
+
+        wait = login_retry_after(username, ip)
+        if wait:
+            response = jsonify({"error": "Too many failed logins, try again later"})
+            response.headers["Retry-After"] = str(math.ceil(wait))
+            return response, 429
 
         cursor = db.connection.cursor()
         cursor.execute(
@@ -21,7 +50,15 @@ def login():
         )
         user = cursor.fetchone()
 
-        if user and check_password_hash(user[2], password):
+        if user and verify_password(user[2], password):
+            if needs_rehash(user[2]):
+                # Hash parameters changed since this password was set
+                cursor.execute(
+                    "UPDATE users SET password = %s WHERE user_id = %s",
+                    (hash_password(password), user[0]),
+                )
+                db.connection.commit()
+
             user_data = {"id": str(user[0]), "username": user[1], "role": user[3]}
 
             access_token = create_access_token(
@@ -31,10 +68,71 @@ def login():
                     "role": user_data["role"],
                 },
             )
+            refresh_token = create_refresh_token(identity=user_data["id"])
 
-            return jsonify({"access_token": access_token, "user": user_data}), 200
+            return (
+                jsonify(
+                    {
+                        "access_token": access_token,
+                        "refresh_token": refresh_token,
+                        "user": user_data,
+                    }
+                ),
+                200,
+            )
         else:
+            record_failed_login(username, ip)
             return jsonify({"error": "Invalid credentials"}), 401
+    except PasswordHashBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@auth_routes.route("/api/token/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+    """Issue a new access token for a refresh token. The username and role are
+    read again, so changes to them apply from the next refresh."""
+    try:
+        cursor = db.connection.cursor()
+        cursor.execute(
+            "SELECT user_id, username, role FROM users WHERE user_id = %s",
+            (get_jwt_identity(),),
+        )
+        user = cursor.fetchone()
+        if not user:
+            return jsonify({"error": "User not found"}), 401
+
+        access_token = create_access_token(
+            identity=str(user[0]),
+            additional_claims={"username": user[1], "role": user[2]},
+        )
+        return jsonify({"access_token": access_token}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@auth_routes.route("/api/logout", methods=["POST"])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the presented token and, if given, the ``refresh_token`` in the
+    body, so neither can be used again."""
+    try:
+        data = request.get_json(silent=True) or {}
+        claims = None
+        if data.get("refresh_token"):
+            try:
+                claims = decode_token(data["refresh_token"])
+            except (PyJWTError, JWTExtendedException) as e:
+                return jsonify({"error": f"Invalid refresh token: {e}"}), 401
+            if claims["sub"] != get_jwt_identity():
+                return jsonify({"error": "Token belongs to another user"}), 403
+
+        revoke_token(get_jwt())
+        if claims is not None:
+            revoke_token(claims)
+        return jsonify({"message": "Logged out"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -44,3 +142,17 @@ def login():
 def protected():
     current_user = get_jwt_identity()
     return jsonify(logged_in_as=current_user), 200
+
+
+def init_app(jwt):
+    @jwt.token_verification_loader
+    def check_token_scope(jwt_header, jwt_data):
+        # Stream tokens travel in URLs, so they open the change feed and nothing else
+        return (
+            jwt_data.get("scope") != STREAM_SCOPE
+            or request.endpoint == "api_routes.stream_change_feed"
+        )
+
+    @jwt.token_verification_failed_loader
+    def scope_mismatch_response(jwt_header, jwt_data):
+        return jsonify({"error": "Token is not valid for this route"}), 403
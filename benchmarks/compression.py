@@ -0,0 +1,137 @@
+"""Compare response compression settings on typical API payloads.
+
+For each payload (item lists of the sizes the frontend polls, a transaction
+report with its chart arrays) prints the compressed size, ratio and CPU time
+per response for several gzip levels, and for brotli and zstd when their
+packages are installed. Use it to pick the COMPRESSION_* levels.
+
+    python benchmarks/compression.py [--runs 20]
+"""
+import argparse
+import datetime
+import json
+import random
+import statistics
+import time
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def items_payload(count):
+    random.seed(count)
+    return [
+        {
+            "item_id": i,
+            "name": f"Item {i} {random.choice(['bolt', 'nut', 'screw', 'washer'])}",
+            "category_id": random.randint(1, 20),
+            "quantity": random.randint(0, 500),
+            "image_path": f"uploads/{i}.jpg" if i % 3 else None,
+            "reorder_point": 10,
+            "critical_point": 5,
+            "last_transaction_at": "2024-05-01 12:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def transaction_report_payload():
+    random.seed(0)
+    start = datetime.date(2024, 1, 1)
+    days = [str(start + datetime.timedelta(days=d)) for d in range(30)]
+    return {
+        "summary": [
+            {"title": "Total Transactions", "value": 1234},
+            {"title": "Stock In", "value": 700},
+            {"title": "Stock Out", "value": 534},
+        ],
+        "chartData": {
+            "type": "line",
+            "labels": days,
+            "datasets": [
+                {"label": "Stock In", "data": [random.randint(0, 90) for _ in days]},
+                {"label": "Stock Out", "data": [random.randint(0, 90) for _ in days]},
+            ],
+        },
+        "headers": [{"title": "ID", "key": "id"}, {"title": "Item", "key": "item"}],
+        "items": [
+            {
+                "id": i,
+                "item": f"Item {random.randint(1, 500)}",
+                "user": "staff",
+                "type": random.choice(["Stock In", "Stock Out"]),
+                "quantity": random.randint(1, 50),
+                "date": "2024-01-30 10:15:00",
+                "notes": None,
+            }
+            for i in range(100)
+        ],
+    }
+
+
+PAYLOADS = {
+    "items x100": items_payload(100),
+    "items x1000": items_payload(1000),
+    "items x10000": items_payload(10000),
+    "transaction report": transaction_report_payload(),
+}
+
+
+def _gzip(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _brotli(data, quality):
+    return brotli.compress(data, quality=quality)
+
+
+def _zstd(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+def codecs():
+    """(name, compress function, level) for every setting to measure"""
+    settings = [("gzip", _gzip, level) for level in (1, 6, 9)]
+    if brotli is not None:
+        settings += [("br", _brotli, quality) for quality in (1, 4, 6, 11)]
+    if zstandard is not None:
+        settings += [("zstd", _zstd, level) for level in (1, 3, 9)]
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    if brotli is None or zstandard is None:
+        print("brotli and/or zstandard are not installed and are skipped\n")
+
+    for name, payload in PAYLOADS.items():
+        data = json.dumps(payload).encode()
+        print(f"== {name}: {len(data) / 1024:.1f} KiB")
+        for codec, compress, level in codecs():
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                compressed = compress(data, level)
+                timings.append(time.perf_counter() - started)
+            print(
+                f"   {codec}-{level:<3} {len(compressed) / 1024:8.1f} KiB"
+                f"   ratio {len(data) / len(compressed):5.1f}x"
+                f"   {statistics.median(timings) * 1000:7.2f} ms"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
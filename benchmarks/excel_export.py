@@ -0,0 +1,117 @@
+"""Compare Excel export paths: wall time and peak RSS for large reports.
+
+"pandas (before)" materializes the rows as dicts and writes them through a
+DataFrame and pd.ExcelWriter, as the exporter did previously. "xlsxwriter
+(current)" is exporters.write_excel_report, fed from a generator the way a
+server-side cursor feeds it. Each run is a fresh subprocess, so the peak RSS
+belongs to that path alone.
+
+    python benchmarks/excel_export.py [--rows 100000 1000000] [--runs 1]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import datetime, io, resource, sys, tempfile, time
+
+ROWS = {rows}
+FIELDS = ("id", "item", "user", "type", "quantity", "date", "notes")
+COLUMNS = [("id", "ID"), ("item", "Item"), ("type", "Type"),
+           ("quantity", "Quantity"), ("date", "Date"), ("user", "User")]
+
+
+def rows():
+    start = datetime.datetime(2024, 1, 1)
+    for i in range(ROWS):
+        yield (
+            i + 1,
+            f"Item {{i % 5000}}",
+            f"user{{i % 50}}",
+            "Stock In" if i % 3 else "Stock Out",
+            i % 250 + 1,
+            (start + datetime.timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            "restock" if i % 7 == 0 else None,
+        )
+
+
+def run_pandas(f):
+    import pandas as pd
+
+    items = [dict(zip(FIELDS, row)) for row in rows()]
+    writer = pd.ExcelWriter(f, engine="xlsxwriter")
+    pd.DataFrame([{{"Metric": "Total Transactions", "Value": ROWS}}]).to_excel(
+        writer, sheet_name="Summary", index=False
+    )
+    pd.DataFrame(items).to_excel(writer, sheet_name="Details", index=False)
+    writer.close()
+
+
+def run_xlsxwriter(f):
+    from exporters import write_excel_report
+    from reports import Report
+
+    report = Report(
+        "transaction", [("Total Transactions", ROWS)], None, COLUMNS, FIELDS, rows()
+    )
+    write_excel_report(report, f)
+
+
+with tempfile.TemporaryFile() as f:
+    started = time.perf_counter()
+    run_{path}(f)
+    elapsed = time.perf_counter() - started
+    size = f.tell()
+
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(f"RESULT {{elapsed}} {{rss_kb}} {{size}}", file=sys.stderr)
+"""
+
+PATHS = {
+    "pandas (before)": "pandas",
+    "xlsxwriter (current)": "xlsxwriter",
+}
+
+
+def run(path, rows):
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(path=path, rows=rows)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed, rss_kb, size = next(
+        line.split()[1:]
+        for line in result.stderr.splitlines()
+        if line.startswith("RESULT ")
+    )
+    return float(elapsed), int(rss_kb), int(size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        print(f"== {rows:,} rows")
+        for name, path in PATHS.items():
+            results = [run(path, rows) for _ in range(args.runs)]
+            elapsed = statistics.median(result[0] for result in results)
+            rss_kb = statistics.median(result[1] for result in results)
+            size = results[0][2]
+            print(
+                f"   {name:22} {elapsed:8.1f} s   peak RSS {rss_kb / 1024:8.1f} MiB"
+                f"   file {size / 1024 / 1024:6.1f} MiB"
+            )
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Compare JSON response serialization for large item and transaction lists.
+
+"stdlib (before)" formats each row's datetime with str() in Python and
+serializes with Flask's default provider, as the handlers used to.
+"orjson (current)" hands the raw rows (datetimes, Decimals) to
+json_provider.OrjsonProvider. Times cover building the payload from the rows
+and the Response body.
+
+    python benchmarks/json_serialization.py [--runs 5]
+"""
+import argparse
+import datetime
+import decimal
+import os
+import statistics
+import sys
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_provider import OrjsonProvider  # noqa: E402
+
+START = datetime.datetime(2024, 1, 1, 8, 0, 0)
+
+
+def item_rows(count):
+    return [
+        (i, f"Item {i}", i % 20 + 1, i % 500, None, 10, 5, START)
+        for i in range(count)
+    ]
+
+
+def transaction_rows(count):
+    return [
+        (
+            i,
+            i % 5000,
+            i % 50,
+            "in" if i % 3 else "out",
+            i % 40 + 1,
+            START + datetime.timedelta(minutes=i),
+            None,
+            f"user{i % 50}",
+        )
+        for i in range(count)
+    ]
+
+
+def items_before(rows):
+    return [
+        {
+            "item_id": r[0],
+            "name": r[1],
+            "category_id": r[2],
+            "quantity": r[3],
+            "image_path": r[4],
+            "reorder_point": r[5],
+            "critical_point": r[6],
+            "last_transaction_at": str(r[7]) if r[7] else None,
+        }
+        for r in rows
+    ]
+
+
+def items_after(rows):
+    return [
+        {
+            "item_id": r[0],
+            "name": r[1],
+            "category_id": r[2],
+            "quantity": r[3],
+            "image_path": r[4],
+            "reorder_point": r[5],
+            "critical_point": r[6],
+            "last_transaction_at": r[7],
+        }
+        for r in rows
+    ]
+
+
+def transactions_before(rows):
+    return [
+        {
+            "transaction_id": t[0],
+            "item_id": t[1],
+            "user_id": t[2],
+            "transaction_type": t[3],
+            "quantity_change": t[4],
+            "transaction_date": str(t[5]),
+            "notes": t[6],
+            "username": t[7],
+        }
+        for t in rows
+    ]
+
+
+def transactions_after(rows):
+    return [
+        {
+            "transaction_id": t[0],
+            "item_id": t[1],
+            "user_id": t[2],
+            "transaction_type": t[3],
+            "quantity_change": t[4],
+            "transaction_date": t[5],
+            "notes": t[6],
+            "username": t[7],
+        }
+        for t in rows
+    ]
+
+
+def report_before(rows):
+    return {
+        "summary": [{"title": "Total Quantity", "value": "123456"}],
+        "items": [{"id": t[0], "quantity": t[4], "date": str(t[5])} for t in rows],
+    }
+
+
+def report_after(rows):
+    return {
+        "summary": [{"title": "Total Quantity", "value": decimal.Decimal("123456")}],
+        "items": [{"id": t[0], "quantity": t[4], "date": t[5]} for t in rows],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {
+        "stdlib (before)": DefaultJSONProvider(app),
+        "orjson (current)": OrjsonProvider(app),
+    }
+    cases = [
+        ("items x10000", item_rows(10000), items_before, items_after),
+        (
+            "transactions x100000",
+            transaction_rows(100000),
+            transactions_before,
+            transactions_after,
+        ),
+        ("report rows x100000", transaction_rows(100000), report_before, report_after),
+    ]
+
+    with app.app_context():
+        for name, rows, before, after in cases:
+            print(f"== {name}")
+            for (label, provider), build in zip(providers.items(), (before, after)):
+                timings = []
+                for _ in range(args.runs):
+                    started = time.perf_counter()
+                    response = provider.response(build(rows))
+                    timings.append(time.perf_counter() - started)
+                size = len(response.get_data())
+                print(
+                    f"   {label:17} {statistics.median(timings) * 1000:8.1f} ms"
+                    f"   {size / 1024:9.1f} KiB"
+                )
+            print()
+
+
+if __name__ == "__main__":
+    main()
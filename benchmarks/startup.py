@@ -0,0 +1,90 @@
+"""Measure worker boot cost: wall time, peak RSS and the slowest imports.
+
+Compares importing the app as it boots now (report exporters and the AI
+stack loaded lazily) with importing it plus those modules, which is what
+every worker paid at boot before they were split out.
+
+    python benchmarks/startup.py [--runs 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    "lazy (current)": "import app",
+    "eager (before)": "import app, exporters, ai.process",
+}
+
+PROBE = """
+import resource, sys, time
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(f"RESULT {{elapsed}} {{rss_kb}}", file=sys.stderr)
+"""
+
+
+def run(imports, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", PROBE.format(imports=imports)]
+
+    result = subprocess.run(
+        command, cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    lines = result.stderr.splitlines()
+    elapsed, rss_kb = next(
+        line.split()[1:] for line in lines if line.startswith("RESULT ")
+    )
+    return float(elapsed), int(rss_kb), lines
+
+
+def slowest_imports(lines, top):
+    """Parse ``-X importtime`` output into (cumulative_us, module) pairs."""
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((int(cumulative_us), module.strip()))
+    # Only top-level packages, otherwise numpy shows up once per submodule
+    rows = [row for row in rows if "." not in row[1]]
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    for name, imports in SCENARIOS.items():
+        timings = []
+        peak_rss = []
+        for _ in range(args.runs):
+            elapsed, rss_kb, _ = run(imports)
+            timings.append(elapsed)
+            peak_rss.append(rss_kb)
+
+        print(f"== {name}: {imports}")
+        print(
+            f"   boot time  median {statistics.median(timings) * 1000:8.0f} ms"
+            f"   min {min(timings) * 1000:8.0f} ms"
+        )
+        print(f"   peak RSS   median {statistics.median(peak_rss) / 1024:8.1f} MiB")
+
+        _, _, lines = run(imports, importtime=True)
+        print("   slowest imports (cumulative):")
+        for cumulative_us, module in slowest_imports(lines, args.top):
+            print(f"     {cumulative_us / 1000:8.1f} ms  {module}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import datetime
+import functools
+import json
+import math
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import make_response, request
+
+from config import app
+from database import read_connection
+from models import current_row_version
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class MemoryBackend:
+    """Process-local version counters and report entries."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        # Counters restart at 0 with the process; the epoch keeps ETags from
+        # before a restart from matching
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def get_versions(self, tables):
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump_versions(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+
+class RedisBackend:
+    """Version counters and report entries shared between instances."""
+
+    def __init__(self, url, prefix="inventory:"):
+        if redis is None:
+            raise RuntimeError("CACHE_REDIS_URL is set but redis is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+        self._epoch = None
+
+    @property
+    def epoch(self):
+        # Shared by every instance, and only replaced if Redis loses its data
+        # (and with it the version counters)
+        if self._epoch is None:
+            key = f"{self._prefix}epoch"
+            self._client.set(key, uuid.uuid4().hex[:8], nx=True)
+            self._epoch = self._client.get(key).decode()
+        return self._epoch
+
+    def get_versions(self, tables):
+        values = self._client.mget([f"{self._prefix}version:{t}" for t in tables])
+        return tuple(int(value or 0) for value in values)
+
+    def bump_versions(self, tables):
+        pipeline = self._client.pipeline(transaction=False)
+        for table in tables:
+            pipeline.incr(f"{self._prefix}version:{table}")
+        pipeline.execute()
+
+    def get(self, key):
+        value = self._client.get(f"{self._prefix}report:{key}")
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.setex(f"{self._prefix}report:{key}", int(ttl), pickle.dumps(value))
+
+
+class LRUCache:
+    """Thread-safe LRU with a per-entry time to live."""
+
+    def __init__(self, max_entries, ttl):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _make_backend():
+    if app.config["CACHE_REDIS_URL"]:
+        print("Report cache shared via Redis")
+        return RedisBackend(app.config["CACHE_REDIS_URL"])
+    return MemoryBackend()
+
+
+backend = _make_backend()
+reports = LRUCache(app.config["REPORT_CACHE_SIZE"], app.config["REPORT_CACHE_TTL"])
+
+
+def bump_version(*tables):
+    """Mark ``tables`` as changed. Call after the write has been committed."""
+    try:
+        backend.bump_versions(tables)
+    except Exception as e:
+        print(f"WARNING: Could not bump data version for {tables}: {e}")
+
+
+def get_versions(tables):
+    return backend.get_versions(tables)
+
+
+def snapshot_version():
+    """current_row_version() of the connection read-only handlers query.
+
+    Under REPEATABLE READ, reading it first pins the snapshot the rest of the
+    request reads, so a body built from a lagging replica is labelled with
+    the version it actually contains rather than the newest one."""
+    return current_row_version(read_connection().cursor())
+
+
+def cached_report(report_type, params, tables, build):
+    """Return ``build()``'s (data, status) for a report, reusing a cached
+    result while none of ``tables`` has changed since it was built.
+
+    The key includes the snapshot_version() the build reads, so reports
+    built from a replica are cached under the replica's version and are
+    rebuilt once it catches up."""
+    if not reports.ttl:
+        return build()
+
+    try:
+        versions = get_versions(tables)
+        snapshot = snapshot_version()[0]
+    except Exception as e:
+        print(f"WARNING: Report cache unavailable: {e}")
+        return build()
+
+    key = json.dumps(
+        [report_type, params, versions, snapshot], sort_keys=True, default=str
+    )
+
+    result = reports.get(key)
+    if result is None:
+        try:
+            result = backend.get(key)
+        except Exception as e:
+            print(f"WARNING: Shared report cache unavailable: {e}")
+        if result is not None:
+            reports.set(key, result)
+
+    if result is not None:
+        return result
+
+    result = build()
+    if result[1] == 200:
+        reports.set(key, result)
+        try:
+            backend.set(key, result, reports.ttl)
+        except Exception as e:
+            print(f"WARNING: Shared report cache unavailable: {e}")
+    return result
+
+
+def versioned(*tables):
+    """Add an ETag and Last-Modified to a GET view, and answer matching
+    conditional requests with 304 without calling the view.
+
+    Both come from the data versions of ``tables`` and the snapshot_version()
+    the view then reads from, so a body from a lagging replica carries that
+    replica's version and date, and is replaced once the replica catches up.
+    A 304 costs one primary-key read instead of the whole listing."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = backend.get_versions(tables)
+                snapshot, updated_at = snapshot_version()
+                etag = "-".join([backend.epoch, *map(str, versions), str(snapshot)])
+            except Exception as e:
+                print(f"WARNING: Data versions unavailable: {e}")
+                return fn(*args, **kwargs)
+
+            # Rounded up, so the date a client echoes back is not older than
+            # the write it describes
+            last_modified = datetime.datetime.fromtimestamp(
+                math.ceil(updated_at), datetime.timezone.utc
+            )
+
+            # If-None-Match takes precedence; it is exact, while dates only
+            # have second precision
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                not_modified = since is not None and updated_at <= since.timestamp()
+
+            if not_modified:
+                response = app.response_class(status=304)
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Clients may keep the body but must revalidate before using it
+            response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
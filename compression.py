@@ -0,0 +1,107 @@
+from flask import request
+
+from streaming import gzip_compressor, iter_compressed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Already compressed or meant to be consumed incrementally
+SKIPPED_MIMETYPES = {
+    "application/gzip",
+    "application/zip",
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "text/event-stream",
+}
+SKIPPED_PREFIXES = ("image/", "video/", "audio/")
+
+
+class _BrotliCompressor:
+    """Give brotli's compressor the compress/flush interface of zlib's"""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.finish()
+
+
+def _compressors(config):
+    """Available encodings in order of preference, with compressor factories"""
+    zstd_level = config["COMPRESSION_ZSTD_LEVEL"]
+    brotli_quality = config["COMPRESSION_BROTLI_QUALITY"]
+    gzip_level = config["COMPRESSION_GZIP_LEVEL"]
+
+    def zstd():
+        # ZstdCompressor objects must not be shared between threads
+        return zstandard.ZstdCompressor(level=zstd_level).compressobj()
+
+    def br():
+        return _BrotliCompressor(brotli_quality)
+
+    def gzip():
+        return gzip_compressor(gzip_level)
+
+    compressors = {}
+    if zstandard is not None:
+        compressors["zstd"] = zstd
+    if brotli is not None:
+        compressors["br"] = br
+    compressors["gzip"] = gzip
+    return compressors
+
+
+def _should_compress(response, min_size):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if "Content-Encoding" in response.headers or response.direct_passthrough:
+        return False
+    mimetype = response.mimetype or ""
+    if mimetype in SKIPPED_MIMETYPES or mimetype.startswith(SKIPPED_PREFIXES):
+        return False
+    if response.is_streamed:
+        return True
+    return response.content_length is not None and response.content_length >= min_size
+
+
+def init_app(app):
+    compressors = _compressors(app.config)
+    min_size = app.config["COMPRESSION_MIN_SIZE"]
+
+    @app.after_request
+    def compress_response(response):
+        if request.method == "HEAD" or not _should_compress(response, min_size):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = request.accept_encodings.best_match(list(compressors))
+        if encoding is None:
+            return response
+
+        compressor = compressors[encoding]()
+        if response.is_streamed:
+            # Chunked responses are compressed as they are generated
+            response.response = iter_compressed(response.iter_encoded(), compressor)
+            response.headers.pop("Content-Length", None)
+        else:
+            response.set_data(
+                compressor.compress(response.get_data()) + compressor.flush()
+            )
+
+        response.headers["Content-Encoding"] = encoding
+        # The body differs from the identity encoding, but it is still the
+        # same representation for If-None-Match purposes
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
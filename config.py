@@ -40,4 +40,124 @@ else:
     app.config["DB_TYPE"] = "mysql"
     
     db = MySQL(app)
-    print("Connected to local MySQL")
\ No newline at end of file
+    print("Connected to local MySQL")
+
+if os.environ.get("DATABASE_REPLICA_URL"):
+    from urllib.parse import urlparse
+    replica_url = urlparse(os.environ.get("DATABASE_REPLICA_URL"))
+
+    app.config["MYSQL_REPLICA_HOST"] = replica_url.hostname
+    app.config["MYSQL_REPLICA_PORT"] = replica_url.port or 3306
+    app.config["MYSQL_REPLICA_USER"] = replica_url.username
+    app.config["MYSQL_REPLICA_PASSWORD"] = replica_url.password
+    app.config["MYSQL_REPLICA_DB"] = replica_url.path[1:]
+
+    print("Read replica configured via connection string")
+
+# Seconds during which a user's reads stay on the primary after they write,
+# and during which all reads do after the replica failed to connect
+app.config["REPLICA_READ_AFTER_WRITE_SECONDS"] = float(
+    os.environ.get("REPLICA_READ_AFTER_WRITE_SECONDS", 5)
+)
+app.config["REPLICA_RETRY_SECONDS"] = float(
+    os.environ.get("REPLICA_RETRY_SECONDS", 30)
+)
+
+# Statements slower than this are logged with their route (0 disables)
+app.config["SLOW_QUERY_MS"] = float(os.environ.get("SLOW_QUERY_MS", 200))
+# Warn when one request runs the same statement shape more than this many times
+app.config["N_PLUS_ONE_THRESHOLD"] = int(os.environ.get("N_PLUS_ONE_THRESHOLD", 10))
+
+# Report cache: in-process LRU, optionally shared between instances via Redis
+app.config["CACHE_REDIS_URL"] = os.environ.get("CACHE_REDIS_URL")
+app.config["REPORT_CACHE_SIZE"] = int(os.environ.get("REPORT_CACHE_SIZE", 256))
+app.config["REPORT_CACHE_TTL"] = int(os.environ.get("REPORT_CACHE_TTL", 300))
+
+# Background report exports
+app.config["EXPORT_ARTIFACTS_DIR"] = os.environ.get("EXPORT_ARTIFACTS_DIR", "exports")
+app.config["EXPORT_WORKERS"] = int(os.environ.get("EXPORT_WORKERS", 2))
+app.config["EXPORT_TTL_SECONDS"] = int(os.environ.get("EXPORT_TTL_SECONDS", 3600))
+# How long /api/download-report waits for a PDF before answering 202 with a job
+app.config["PDF_INLINE_WAIT_SECONDS"] = float(
+    os.environ.get("PDF_INLINE_WAIT_SECONDS", 20)
+)
+
+# Response compression; bodies smaller than COMPRESSION_MIN_SIZE bytes are sent
+# as is. brotli and zstd are offered only if their packages are installed.
+app.config["COMPRESSION_MIN_SIZE"] = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))
+app.config["COMPRESSION_GZIP_LEVEL"] = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))
+app.config["COMPRESSION_BROTLI_QUALITY"] = int(
+    os.environ.get("COMPRESSION_BROTLI_QUALITY", 4)
+)
+app.config["COMPRESSION_ZSTD_LEVEL"] = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3))
+
+# Change feed (GET /api/stream/changes): replay buffer size, heartbeat interval,
+# how long one connection stays open before the client reconnects, how many
+# streams one process holds open (each takes a worker thread) and how long a
+# token from /api/stream/token is valid
+app.config["EVENTS_REDIS_URL"] = os.environ.get(
+    "EVENTS_REDIS_URL", app.config["CACHE_REDIS_URL"]
+)
+app.config["EVENTS_BUFFER_SIZE"] = int(os.environ.get("EVENTS_BUFFER_SIZE", 1000))
+app.config["EVENTS_HEARTBEAT_SECONDS"] = float(
+    os.environ.get("EVENTS_HEARTBEAT_SECONDS", 15)
+)
+app.config["EVENTS_MAX_STREAM_SECONDS"] = float(
+    os.environ.get("EVENTS_MAX_STREAM_SECONDS", 300)
+)
+app.config["EVENTS_MAX_STREAMS"] = int(os.environ.get("EVENTS_MAX_STREAMS", 4))
+app.config["EVENTS_TOKEN_SECONDS"] = int(os.environ.get("EVENTS_TOKEN_SECONDS", 60))
+
+# Admission control for /api/detect-objects: concurrent detections, how many
+# more may wait (and for how long) before getting 503, and per-user rate limits
+app.config["DETECTION_MAX_CONCURRENT"] = int(
+    os.environ.get("DETECTION_MAX_CONCURRENT", 2)
+)
+app.config["DETECTION_MAX_QUEUE"] = int(os.environ.get("DETECTION_MAX_QUEUE", 4))
+app.config["DETECTION_QUEUE_TIMEOUT_SECONDS"] = float(
+    os.environ.get("DETECTION_QUEUE_TIMEOUT_SECONDS", 5)
+)
+app.config["DETECTION_RATE_PER_MINUTE"] = float(
+    os.environ.get("DETECTION_RATE_PER_MINUTE", 12)
+)
+app.config["DETECTION_BURST"] = int(os.environ.get("DETECTION_BURST", 4))
+
+# Password hashing: werkzeug method string (e.g. "scrypt" or
+# "pbkdf2:sha256:600000"), hashing threads and how many hashes may queue
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+app.config["PASSWORD_HASH_WORKERS"] = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+app.config["PASSWORD_HASH_MAX_PENDING"] = int(
+    os.environ.get("PASSWORD_HASH_MAX_PENDING", 32)
+)
+# Wrong passwords are remembered this long and rejected without hashing
+app.config["PASSWORD_NEGATIVE_CACHE_SECONDS"] = float(
+    os.environ.get("PASSWORD_NEGATIVE_CACHE_SECONDS", 60)
+)
+# Failed login throttles, per (username, client IP) and per client IP
+app.config["LOGIN_FAILURES_PER_MINUTE"] = float(
+    os.environ.get("LOGIN_FAILURES_PER_MINUTE", 5)
+)
+app.config["LOGIN_FAILURE_BURST"] = int(os.environ.get("LOGIN_FAILURE_BURST", 10))
+app.config["LOGIN_IP_FAILURES_PER_MINUTE"] = float(
+    os.environ.get("LOGIN_IP_FAILURES_PER_MINUTE", 30)
+)
+app.config["LOGIN_IP_FAILURE_BURST"] = int(
+    os.environ.get("LOGIN_IP_FAILURE_BURST", 50)
+)
+
+# How often each instance pulls new rows of revoked_tokens into memory
+app.config["TOKEN_REVOCATION_SYNC_SECONDS"] = float(
+    os.environ.get("TOKEN_REVOCATION_SYNC_SECONDS", 10)
+)
+
+# Bearer token required to scrape /metrics; unset leaves it open, so only
+# expose the port to the scraper
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN")
+
+# Request profiling: where profiles are saved and how many are kept, and the
+# fraction of all requests profiled without an X-Profile header (0 disables)
+app.config["PROFILE_ARTIFACTS_DIR"] = os.environ.get(
+    "PROFILE_ARTIFACTS_DIR", "profiles"
+)
+app.config["PROFILE_MAX_FILES"] = int(os.environ.get("PROFILE_MAX_FILES", 200))
+app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
@@ -0,0 +1,225 @@
+import re
+import threading
+import time
+from collections import Counter
+
+import MySQLdb
+from MySQLdb import cursors
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_mysqldb import MySQL
+
+from config import app, db
+
+
+def normalize_query(query):
+    """Reduce a statement to its shape: literals become ``?`` and variable
+    length ``IN (...)`` lists collapse, so repeated queries group together."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    query = re.sub(r"'(?:[^'\\]|\\.|'')*'", "?", query)
+    query = re.sub(r"\b\d+\b", "?", query)
+    query = re.sub(r"%s", "?", query)
+    query = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(...)", query)
+    query = re.sub(r"\s+", " ", query).strip()
+    return re.sub(r"(?:WHEN \? THEN \? )+", "WHEN ? THEN ? ... ", query)
+
+
+class InstrumentedCursorMixin:
+    """Records every statement run during a request on ``g.sql_stats``."""
+
+    _in_executemany = False
+
+    def _record(self, query, started):
+        duration = time.perf_counter() - started
+        if self._in_executemany or not has_request_context():
+            return
+
+        stats = g.get("sql_stats")
+        if stats is None:
+            stats = g.sql_stats = {"count": 0, "time": 0.0, "shapes": Counter()}
+
+        shape = normalize_query(query)
+        stats["count"] += 1
+        stats["time"] += duration
+        stats["shapes"][shape] += 1
+
+        threshold = current_app.config["SLOW_QUERY_MS"]
+        if threshold and duration * 1000 >= threshold:
+            route = request.url_rule.rule if request.url_rule else request.path
+            print(
+                f"SLOW QUERY ({duration * 1000:.1f} ms, {self.rowcount} rows) "
+                f"{request.method} {route}: {shape}"
+            )
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            self._record(query, started)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        self._in_executemany = True
+        try:
+            return super().executemany(query, args)
+        finally:
+            self._in_executemany = False
+            self._record(query, started)
+
+
+class InstrumentedCursor(InstrumentedCursorMixin, cursors.Cursor):
+    pass
+
+
+class InstrumentedSSCursor(InstrumentedCursorMixin, cursors.SSCursor):
+    """Server-side cursor: rows are fetched from MySQL as they are read
+    instead of being buffered in full by ``execute``."""
+
+
+class ReplicaMySQL(MySQL):
+    """flask_mysqldb connection bound to the MYSQL_REPLICA_* settings.
+
+    Stored on ``g`` under its own name so it lives next to the primary
+    connection for the duration of the app context."""
+
+    def init_app(self, app):
+        app.teardown_appcontext(self.teardown)
+
+    @property
+    def connect(self):
+        config = current_app.config
+        kwargs = {
+            "host": config["MYSQL_REPLICA_HOST"],
+            "port": config["MYSQL_REPLICA_PORT"],
+            "user": config["MYSQL_REPLICA_USER"],
+            "passwd": config["MYSQL_REPLICA_PASSWORD"],
+            "db": config["MYSQL_REPLICA_DB"],
+            "charset": config["MYSQL_CHARSET"],
+            "connect_timeout": config["MYSQL_CONNECT_TIMEOUT"],
+        }
+        kwargs = {key: value for key, value in kwargs.items() if value}
+
+        if config["MYSQL_CUSTOM_OPTIONS"]:
+            kwargs.update(config["MYSQL_CUSTOM_OPTIONS"])
+
+        return MySQLdb.connect(**kwargs)
+
+    @property
+    def connection(self):
+        if not hasattr(g, "mysql_replica_db"):
+            g.mysql_replica_db = self.connect
+        return g.mysql_replica_db
+
+    def teardown(self, exception):
+        if hasattr(g, "mysql_replica_db"):
+            g.mysql_replica_db.close()
+
+
+replica_db = ReplicaMySQL(app) if app.config.get("MYSQL_REPLICA_HOST") else None
+
+# user id -> time.monotonic() of their last successful write
+_last_writes = {}
+_last_writes_lock = threading.Lock()
+_MAX_TRACKED_WRITERS = 10000
+
+# time.monotonic() until which reads skip the replica after it failed to connect
+_replica_down_until = 0.0
+
+
+def _current_user():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def note_write(user_id):
+    """Pin ``user_id``'s reads to the primary for the read-after-write window."""
+    if replica_db is None or user_id is None:
+        return
+
+    now = time.monotonic()
+    window = current_app.config["REPLICA_READ_AFTER_WRITE_SECONDS"]
+
+    with _last_writes_lock:
+        _last_writes[user_id] = now
+        if len(_last_writes) > _MAX_TRACKED_WRITERS:
+            for key in [k for k, t in _last_writes.items() if now - t >= window]:
+                del _last_writes[key]
+
+
+def _wrote_recently(user_id):
+    with _last_writes_lock:
+        last_write = _last_writes.get(user_id)
+
+    return (
+        last_write is not None
+        and time.monotonic() - last_write
+        < current_app.config["REPLICA_READ_AFTER_WRITE_SECONDS"]
+    )
+
+
+def read_connection():
+    """Return the connection read-only handlers should query.
+
+    Uses the replica when one is configured, except for users who wrote within
+    the read-after-write window, who keep reading from the primary so they see
+    their own changes. Falls back to the primary if the replica is down, and
+    keeps off it for REPLICA_RETRY_SECONDS so every read does not wait out a
+    connect timeout."""
+    global _replica_down_until
+    if replica_db is None:
+        return db.connection
+
+    user_id = _current_user()
+    if user_id is not None and _wrote_recently(user_id):
+        return db.connection
+
+    if time.monotonic() < _replica_down_until:
+        return db.connection
+
+    try:
+        return replica_db.connection
+    except MySQLdb.Error as e:
+        retry = current_app.config["REPLICA_RETRY_SECONDS"]
+        _replica_down_until = time.monotonic() + retry
+        print(f"WARNING: Read replica unavailable, using primary for {retry:g} s: {e}")
+        return db.connection
+
+
+def init_app(app):
+    options = dict(app.config["MYSQL_CUSTOM_OPTIONS"] or {})
+    options.setdefault("cursorclass", InstrumentedCursor)
+    app.config["MYSQL_CUSTOM_OPTIONS"] = options
+
+    @app.after_request
+    def report_sql_stats(response):
+        stats = g.get("sql_stats")
+        if stats is None:
+            return response
+
+        db_time_ms = stats["time"] * 1000
+        response.headers["X-DB-Query-Count"] = str(stats["count"])
+        response.headers["Server-Timing"] = (
+            f'db;dur={db_time_ms:.1f};desc="{stats["count"]} queries"'
+        )
+
+        limit = app.config["N_PLUS_ONE_THRESHOLD"]
+        if limit:
+            route = request.url_rule.rule if request.url_rule else request.path
+            for shape, count in stats["shapes"].items():
+                if count > limit:
+                    print(
+                        f"WARNING: possible N+1 on {request.method} {route}: "
+                        f"{count} x {shape}"
+                    )
+        return response
+
+    @app.after_request
+    def remember_writes(response):
+        if request.method in ("POST", "PUT", "DELETE") and response.status_code < 400:
+            note_write(_current_user())
+        return response
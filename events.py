@@ -0,0 +1,152 @@
+import collections
+import itertools
+import json
+import threading
+import time
+
+from admission import AdmissionLimiter
+from config import app
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class ChangeFeed:
+    """Bounded buffer of recent change events that stream connections wait on.
+
+    Events are kept as ready-to-send SSE frames, so each one is serialized
+    once no matter how many clients receive it."""
+
+    def __init__(self, size):
+        self._events = collections.deque(maxlen=size)
+        self._condition = threading.Condition()
+
+    def append(self, event_id, event_type, data):
+        frame = f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n"
+        with self._condition:
+            self._events.append((event_id, frame))
+            self._condition.notify_all()
+
+    def last_id(self):
+        with self._condition:
+            return self._events[-1][0] if self._events else 0
+
+    def since(self, last_id):
+        """Return ((id, frame) pairs after ``last_id``, whether events were
+        missed). Events were missed when ``last_id`` fell out of the buffer,
+        or is ahead of it because the event ids were reset."""
+        with self._condition:
+            if not self._events:
+                return [], False
+            oldest, newest = self._events[0][0], self._events[-1][0]
+            if last_id > newest or last_id < oldest - 1:
+                return [], True
+            return [event for event in self._events if event[0] > last_id], False
+
+    def wait(self, last_id, timeout):
+        """Block until an event other than ``last_id`` is the newest, or for
+        ``timeout`` seconds. Returns whether one arrived."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: bool(self._events) and self._events[-1][0] != last_id,
+                timeout,
+            )
+
+
+class MemoryFanout:
+    """Delivers events to the streams of this process only."""
+
+    def __init__(self):
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def start(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._deliver(next(self._ids), event_type, data)
+
+
+class RedisFanout:
+    """Delivers events to every instance through a Redis pub/sub channel.
+
+    Event ids come from a shared counter, so a client can resume with its
+    Last-Event-ID on any instance."""
+
+    def __init__(self, url, channel="inventory:events"):
+        if redis is None:
+            raise RuntimeError("EVENTS_REDIS_URL is set but redis is not installed")
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+
+    def start(self, deliver):
+        thread = threading.Thread(target=self._listen, args=(deliver,), daemon=True)
+        thread.start()
+
+    def _listen(self, deliver):
+        while True:
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self._channel)
+                for message in pubsub.listen():
+                    event_id, event_type, data = json.loads(message["data"])
+                    deliver(event_id, event_type, data)
+            except Exception as e:
+                print(f"WARNING: Change feed subscription lost, retrying: {e}")
+                time.sleep(1)
+
+    def publish(self, event_type, data):
+        event_id = self._client.incr(f"{self._channel}:id")
+        self._client.publish(self._channel, json.dumps([event_id, event_type, data]))
+
+
+def _make_fanout():
+    if app.config["EVENTS_REDIS_URL"]:
+        print("Change feed shared via Redis")
+        return RedisFanout(app.config["EVENTS_REDIS_URL"])
+    return MemoryFanout()
+
+
+feed = ChangeFeed(app.config["EVENTS_BUFFER_SIZE"])
+fanout = _make_fanout()
+fanout.start(feed.append)
+# Open streams per process; extra connections are refused instead of queued
+stream_limiter = AdmissionLimiter(app.config["EVENTS_MAX_STREAMS"], 0, 0)
+
+
+def publish_event(event_type, data):
+    """Announce a committed change to stream subscribers. Call after commit."""
+    try:
+        fanout.publish(event_type, app.json.dumps(data))
+    except Exception as e:
+        print(f"WARNING: Could not publish {event_type} event: {e}")
+
+
+def stream_changes(last_event_id, heartbeat, max_duration):
+    """Yield SSE frames: buffered events after ``last_event_id``, then new
+    ones as they are published, for up to ``max_duration`` seconds."""
+    yield "retry: 3000\n\n"
+
+    if last_event_id is None:
+        last_event_id = feed.last_id()
+
+    deadline = time.monotonic() + max_duration
+    while True:
+        events, missed = feed.since(last_event_id)
+        if missed:
+            # The client's position is gone; it has to reload its lists
+            last_event_id = feed.last_id()
+            yield f"id: {last_event_id}\nevent: reset\ndata: {{}}\n\n"
+        elif events:
+            last_event_id = events[-1][0]
+            yield "".join(frame for event_id, frame in events)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not feed.wait(last_event_id, min(heartbeat, remaining)):
+            # Comment line; keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
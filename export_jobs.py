@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from config import app
+
+ARTIFACTS_FOLDER = app.config["EXPORT_ARTIFACTS_DIR"]
+
+os.makedirs(ARTIFACTS_FOLDER, exist_ok=True)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# job_id -> job dict; key -> job_id of the job currently producing that export
+_jobs = {}
+_jobs_by_key = {}
+_jobs_lock = threading.Lock()
+
+
+def _get_executor(replace_broken=False):
+    global _executor
+    with _executor_lock:
+        if _executor is None or replace_broken:
+            # "spawn" keeps the children from inheriting the worker's threads
+            # and database connections; they only import exporters and reports.
+            _executor = ProcessPoolExecutor(
+                max_workers=app.config["EXPORT_WORKERS"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _status(job):
+    future = job["future"]
+    if not future.done():
+        return ("running", 50) if future.running() else ("queued", 0)
+    if future.exception() is not None:
+        return "failed", 100
+    return "finished", 100
+
+
+def cleanup_expired_jobs():
+    now = time.time()
+    with _jobs_lock:
+        expired = [
+            job
+            for job in _jobs.values()
+            if job["expires_at"] < now and job["future"].done()
+        ]
+        for job in expired:
+            del _jobs[job["id"]]
+            if _jobs_by_key.get(job["key"]) == job["id"]:
+                del _jobs_by_key[job["key"]]
+
+    for job in expired:
+        try:
+            if os.path.exists(job["path"]):
+                os.remove(job["path"])
+        except Exception as e:
+            print(f"Error deleting {job['path']}: {str(e)}")
+
+
+def submit_export(key, report, format_type, filename):
+    """Queue a report export and return its job.
+
+    Requests with the same ``key`` (report, parameters, data versions and
+    format) share one job for as long as its artifact has not expired."""
+    from exporters import render_report_file
+
+    cleanup_expired_jobs()
+
+    with _jobs_lock:
+        job_id = _jobs_by_key.get(key)
+        if job_id in _jobs and _status(_jobs[job_id])[0] != "failed":
+            return _jobs[job_id]
+
+        job_id = uuid.uuid4().hex
+        path = os.path.join(ARTIFACTS_FOLDER, f"{job_id}_{filename}")
+        args = (render_report_file, report, format_type, path)
+        try:
+            future = _get_executor().submit(*args)
+        except BrokenProcessPool:
+            # A crashed child (e.g. killed for memory) breaks the whole pool
+            future = _get_executor(replace_broken=True).submit(*args)
+
+        job = {
+            "id": job_id,
+            "key": key,
+            "path": path,
+            "filename": filename,
+            "report_type": report.report_type,
+            "format": format_type,
+            "created_at": time.time(),
+            "expires_at": time.time() + app.config["EXPORT_TTL_SECONDS"],
+            "future": future,
+        }
+        _jobs[job_id] = job
+        _jobs_by_key[key] = job_id
+
+    return job
+
+
+def wait_for_job(job, timeout):
+    """Wait up to ``timeout`` seconds for a job; return whether it is done"""
+    done, _ = wait([job["future"]], timeout=timeout)
+    return bool(done)
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def describe_job(job):
+    status, progress = _status(job)
+    result = {
+        "job_id": job["id"],
+        "status": status,
+        "progress": progress,
+        "report_type": job["report_type"],
+        "format": job["format"],
+        "expires_at": job["expires_at"],
+    }
+    if status == "failed":
+        result["error"] = str(job["future"].exception())
+    return result
@@ -0,0 +1,364 @@
+import csv
+import datetime
+import decimal
+import functools
+import io
+import itertools
+import json
+import os
+import tempfile
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from flask import send_file
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import (
+    Image,
+    LongTable,
+    Paragraph,
+    SimpleDocTemplate,
+    Table,
+    TableStyle,
+)
+import xlsxwriter
+
+
+REPORT_TITLES = {
+    "inventory": "Inventory Status Report",
+    "category": "Category Analysis Report",
+    "transaction": "Transaction History Report",
+    "low-stock": "Low Stock Alert Report",
+}
+
+
+# Detail rows per LongTable. reportlab's table layout cost grows faster than
+# linearly with row count, so large reports are laid out as many small tables
+# that each repeat the header row when they break across pages.
+PDF_TABLE_CHUNK_ROWS = 500
+# Upper bound on the detail rows laid out in one PDF
+PDF_MAX_ROWS = 50000
+MAX_CHART_POINTS = 40
+# Last row index of an Excel worksheet (row 0 holds the headers)
+EXCEL_MAX_ROW = 1048575
+
+DETAILS_TABLE_STYLE = TableStyle(
+    [
+        ("BACKGROUND", (0, 0), (-1, 0), "#7c4dff"),
+        ("TEXTCOLOR", (0, 0), (-1, 0), "#ffffff"),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 10),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("BACKGROUND", (0, 1), (-1, -1), "#f9f9f9"),
+        ("GRID", (0, 0), (-1, -1), 1, "#888888"),
+    ]
+)
+
+
+def _chart_color(color):
+    """Convert a Chart.js color ("#rrggbb" or "rgba(r, g, b, a)") for matplotlib"""
+    if isinstance(color, str) and color.startswith("rgba("):
+        r, g, b, a = (float(part) for part in color[5:-1].split(","))
+        return (r / 255, g / 255, b / 255, a)
+    return color
+
+
+def _chart_colors(colors, count):
+    if isinstance(colors, list):
+        return [_chart_color(colors[i % len(colors)]) for i in range(count)]
+    return _chart_color(colors)
+
+
+@functools.lru_cache(maxsize=32)
+def _render_chart_png(chart_json):
+    """Render a report's chartData to PNG bytes.
+
+    Keyed on the chart's JSON, so the export workers re-render only when the
+    underlying numbers change."""
+    chart = json.loads(chart_json)
+    labels = chart["labels"]
+    datasets = chart["datasets"]
+
+    fig, ax = plt.subplots(figsize=(7, 3.5), dpi=100)
+    try:
+        if chart["type"] == "pie":
+            # Only the largest slices; the rest are folded into "Other"
+            dataset = datasets[0]
+            values = [float(value or 0) for value in dataset["data"]]
+            slices = sorted(zip(values, labels), reverse=True)
+            shown = slices[: MAX_CHART_POINTS // 4]
+            other = sum(value for value, label in slices[len(shown) :])
+            if other:
+                shown.append((other, "Other"))
+            ax.pie(
+                [value for value, label in shown],
+                labels=[label for value, label in shown],
+                colors=_chart_colors(dataset.get("backgroundColor"), len(shown)),
+                textprops={"fontsize": 7},
+            )
+            ax.axis("equal")
+        elif chart["type"] == "line":
+            positions = range(len(labels))
+            for dataset in datasets:
+                ax.plot(
+                    positions,
+                    [float(value or 0) for value in dataset["data"]],
+                    label=dataset["label"],
+                    color=_chart_color(dataset.get("borderColor")),
+                )
+            step = max(1, len(labels) // 10)
+            ax.set_xticks(list(positions)[::step])
+            ax.set_xticklabels(labels[::step], rotation=30, ha="right", fontsize=7)
+            ax.legend(fontsize=7)
+        else:
+            dataset = datasets[0]
+            count = min(len(labels), MAX_CHART_POINTS)
+            ax.bar(
+                range(count),
+                [float(value or 0) for value in dataset["data"][:count]],
+                color=_chart_colors(dataset.get("backgroundColor"), count),
+                edgecolor=_chart_colors(dataset.get("borderColor"), count),
+            )
+            ax.set_xticks(range(count))
+            ax.set_xticklabels(labels[:count], rotation=45, ha="right", fontsize=7)
+            title = dataset["label"]
+            if len(labels) > count:
+                title += f" (first {count} of {len(labels)})"
+            ax.set_title(title, fontsize=9)
+
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def write_pdf_report(report, buffer):
+    """Write a PDF report to the binary file object ``buffer``"""
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+
+    styles = getSampleStyleSheet()
+    title_style = styles["Heading1"]
+    subtitle_style = styles["Heading2"]
+    normal_style = styles["Normal"]
+
+    title = REPORT_TITLES.get(report.report_type, "Inventory System Report")
+
+    elements.append(Paragraph(title, title_style))
+    elements.append(
+        Paragraph(
+            f"Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+            normal_style,
+        )
+    )
+
+    elements.append(Paragraph("Summary", subtitle_style))
+    summary_data = [[label, str(value)] for label, value in report.summary]
+
+    if summary_data:
+        summary_table = Table(summary_data, colWidths=[300, 200])
+        summary_table.setStyle(
+            TableStyle(
+                [
+                    ("BACKGROUND", (0, 0), (-1, -1), "#f5f5f5"),
+                    ("TEXTCOLOR", (0, 0), (-1, -1), "#333333"),
+                    ("ALIGN", (0, 0), (-1, -1), "LEFT"),
+                    ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
+                    ("FONTSIZE", (0, 0), (-1, -1), 10),
+                    ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+                    ("GRID", (0, 0), (-1, -1), 1, "#888888"),
+                ]
+            )
+        )
+        elements.append(summary_table)
+
+    if report.chart and report.chart.get("labels"):
+        png = _render_chart_png(json.dumps(report.chart, sort_keys=True, default=str))
+        elements.append(Image(io.BytesIO(png), width=doc.width, height=doc.width / 2))
+
+    col_widths = [doc.width / max(len(report.columns), 1)] * len(report.columns)
+    total_rows = 0
+    chunk = []
+
+    def add_chunk():
+        table = LongTable([report.titles] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(DETAILS_TABLE_STYLE)
+        elements.append(table)
+
+    for row in report.iter_table():
+        total_rows += 1
+        if total_rows > PDF_MAX_ROWS:
+            continue
+        if total_rows == 1:
+            elements.append(Paragraph("Details", subtitle_style))
+        chunk.append([str(value) for value in row])
+        if len(chunk) == PDF_TABLE_CHUNK_ROWS:
+            add_chunk()
+            chunk = []
+
+    if chunk:
+        add_chunk()
+
+    if total_rows > PDF_MAX_ROWS:
+        elements.append(
+            Paragraph(f"Showing {PDF_MAX_ROWS} of {total_rows} items", normal_style)
+        )
+
+    doc.build(elements)
+
+
+def _write_cell(worksheet, row, col, value, formats):
+    if value is None:
+        return
+    if isinstance(value, int):
+        worksheet.write_number(row, col, value)
+    elif isinstance(value, (float, decimal.Decimal)):
+        worksheet.write_number(row, col, value, formats["decimal"])
+    elif isinstance(value, datetime.datetime):
+        worksheet.write_datetime(row, col, value, formats["datetime"])
+    else:
+        worksheet.write_string(row, col, str(value))
+
+
+def write_excel_report(report, buffer):
+    """Write an Excel report to the binary file object ``buffer``.
+
+    Uses xlsxwriter's constant_memory mode, which flushes each row to a
+    temporary file once the next one starts, so ``report.rows`` can come
+    straight from a cursor (see transaction_ledger) without ever being held
+    in memory. Rows past Excel's sheet limit are counted, not written."""
+    workbook = xlsxwriter.Workbook(buffer, {"constant_memory": True})
+    header_format = workbook.add_format(
+        {"bold": True, "font_color": "#ffffff", "bg_color": "#7c4dff"}
+    )
+    formats = {
+        "decimal": workbook.add_format({"num_format": "#,##0.00"}),
+        "datetime": workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"}),
+    }
+
+    summary = workbook.add_worksheet("Summary")
+    summary.set_column(0, 0, 30)
+    summary.set_column(1, 1, 15)
+    summary.write_row(0, 0, ["Metric", "Value"], header_format)
+    for row_number, (title, value) in enumerate(report.summary, start=1):
+        summary.write_string(row_number, 0, title)
+        _write_cell(summary, row_number, 1, value, formats)
+
+    rows = iter(report.rows)
+    first_row = next(rows, None)
+    if first_row is not None:
+        titles = dict(report.columns)
+        headers = [titles.get(key, key) for key in report.fields]
+
+        details = workbook.add_worksheet("Details")
+        for col, header in enumerate(headers):
+            width = max(len(header) + 2, 12)
+            if isinstance(first_row[col], datetime.datetime):
+                width = 20
+            details.set_column(col, col, width)
+        details.write_row(0, 0, headers, header_format)
+        details.freeze_panes(1, 0)
+
+        row_number = 1
+        for row in itertools.chain([first_row], rows):
+            if row_number > EXCEL_MAX_ROW:
+                omitted = 1 + sum(1 for _ in rows)
+                summary.write_string(len(report.summary) + 1, 0, "Rows not shown")
+                summary.write_number(len(report.summary) + 1, 1, omitted)
+                break
+            for col, value in enumerate(row):
+                _write_cell(details, row_number, col, value, formats)
+            row_number += 1
+
+        details.autofilter(0, 0, row_number - 1, len(headers) - 1)
+
+    workbook.close()
+
+
+def write_csv_report(report, buffer):
+    """Write a CSV report to the binary file object ``buffer``"""
+    stream = io.TextIOWrapper(buffer, encoding="utf-8", newline="")
+    writer = csv.writer(stream)
+
+    writer.writerow([f"{report.report_type.capitalize()} Report"])
+    writer.writerow(
+        [f"Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
+    )
+    writer.writerow([])
+
+    writer.writerow(["Summary"])
+    writer.writerows(report.summary)
+    writer.writerow([])
+
+    rows = report.iter_table()
+    first_row = next(rows, None)
+    if first_row is not None:
+        writer.writerow(report.titles)
+        writer.writerow(first_row)
+        writer.writerows(rows)
+
+    stream.flush()
+    stream.detach()
+
+
+# format -> (file extension, mimetype, writer)
+FORMATS = {
+    "pdf": ("pdf", "application/pdf", write_pdf_report),
+    "excel": (
+        "xlsx",
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        write_excel_report,
+    ),
+    "csv": ("csv", "text/csv", write_csv_report),
+}
+
+
+def report_filename(report_type, format_type):
+    extension = FORMATS[format_type][0]
+    return f"{report_type}-report-{datetime.datetime.now().strftime('%Y%m%d')}.{extension}"
+
+
+def send_report(report, format_type):
+    """Render a report in memory and send it as a download"""
+    extension, mimetype, write = FORMATS[format_type]
+    buffer = io.BytesIO()
+    write(report, buffer)
+    buffer.seek(0)
+
+    return send_file(
+        buffer,
+        as_attachment=True,
+        download_name=report_filename(report.report_type, format_type),
+        mimetype=mimetype,
+    )
+
+
+def send_report_file(report, format_type, filename):
+    """Render a report to a temporary file and send it as a download, for
+    reports whose rows are streamed and may not fit in memory"""
+    extension, mimetype, write = FORMATS[format_type]
+    # Closed (and so deleted) by the response once it has been sent
+    f = tempfile.TemporaryFile()
+    try:
+        write(report, f)
+        f.seek(0)
+    except Exception:
+        f.close()
+        raise
+
+    return send_file(f, as_attachment=True, download_name=filename, mimetype=mimetype)
+
+
+def render_report_file(report, format_type, path):
+    """Render a report to ``path``. Runs in the export process pool, so the
+    file is written under a temporary name and only appears once complete."""
+    temporary_path = f"{path}.part"
+    with open(temporary_path, "wb") as f:
+        FORMATS[format_type][2](report, f)
+    os.replace(temporary_path, path)
+    return path
@@ -0,0 +1,234 @@
+import csv
+import io
+
+from models import (
+    DEFAULT_REORDER_POINT,
+    adjust_category_stats,
+    is_low_stock,
+    next_row_version,
+)
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+def iter_rows(file):
+    """Yield ``(line number, row)`` for each data row of an uploaded CSV or
+    XLSX file, the row as a dict keyed by lower-cased header, without loading
+    the whole file into memory. Blank rows are skipped but still counted, so
+    the numbers match what the user sees in their editor."""
+    extension = file.filename.rsplit(".", 1)[-1].lower() if file.filename else ""
+
+    if extension == "csv":
+        stream = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is None:
+            return
+        keys = [str(h).strip().lower() for h in header]
+        for values in reader:
+            if any(v.strip() for v in values):
+                yield reader.line_num, dict(zip(keys, values))
+
+    elif extension == "xlsx":
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file.stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            keys = [str(h).strip().lower() if h is not None else "" for h in header]
+            for line, values in enumerate(rows, start=2):
+                if any(v is not None and str(v).strip() for v in values):
+                    yield line, dict(zip(keys, values))
+        finally:
+            workbook.close()
+
+    else:
+        raise ValueError("File type not allowed. Upload a .csv or .xlsx file")
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def parse_row(row, categories, category_ids):
+    """Turn a raw row into (item_id, name, category_id, quantity, image_path).
+
+    Raises ValueError with a message suitable for the import summary."""
+    name = _clean(row.get("name"))
+    if not name:
+        raise ValueError("Item name is required")
+
+    category_id = _clean(row.get("category_id"))
+    category_name = _clean(row.get("category"))
+    if category_id:
+        try:
+            category_id = int(float(category_id))
+        except ValueError:
+            raise ValueError(f"Invalid category_id: {category_id}")
+        if category_id not in category_ids:
+            raise ValueError(f"Category not found: {category_id}")
+    elif category_name:
+        category_id = categories.get(category_name.lower())
+        if category_id is None:
+            raise ValueError(f"Category not found: {category_name}")
+    else:
+        raise ValueError("Category is required")
+
+    quantity = _clean(row.get("quantity"))
+    try:
+        quantity = int(float(quantity)) if quantity is not None else 0
+    except ValueError:
+        raise ValueError(f"Invalid quantity: {quantity}")
+    if quantity < 0:
+        raise ValueError("Quantity cannot be negative")
+
+    item_id = _clean(row.get("item_id"))
+    if item_id is not None:
+        try:
+            item_id = int(float(item_id))
+        except ValueError:
+            raise ValueError(f"Invalid item_id: {item_id}")
+
+    return item_id, name, category_id, quantity, _clean(row.get("image_path"))
+
+
+def _flush(connection, cursor, batch, summary):
+    row_version = next_row_version(cursor)
+
+    # Rows without an item_id are matched to existing items by name and
+    # category, so re-importing the same sheet updates instead of duplicating.
+    names = sorted({row[1] for row in batch if row[0] is None})
+    existing_by_key = {}
+    # item_id -> (category_id, quantity, reorder_point) before this batch,
+    # for category_stats
+    previous = {}
+    if names:
+        placeholders = ", ".join(["%s"] * len(names))
+        cursor.execute(
+            f"SELECT item_id, name, category_id, quantity, reorder_point FROM items "
+            f"WHERE name IN ({placeholders})",
+            tuple(names),
+        )
+        for item_id, name, category_id, quantity, reorder_point in cursor.fetchall():
+            existing_by_key.setdefault((name, category_id), item_id)
+            previous[item_id] = (category_id, quantity, reorder_point)
+
+    ids = sorted({row[0] for row in batch if row[0] is not None})
+    if ids:
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            f"SELECT item_id, category_id, quantity, reorder_point FROM items "
+            f"WHERE item_id IN ({placeholders})",
+            tuple(ids),
+        )
+        for item_id, category_id, quantity, reorder_point in cursor.fetchall():
+            previous[item_id] = (category_id, quantity, reorder_point)
+
+    values = []
+    stats = []
+    for item_id, name, category_id, quantity, image_path in batch:
+        if item_id is None:
+            item_id = existing_by_key.get((name, category_id))
+
+        # Imports leave reorder points alone; new items get the default
+        reorder_point = DEFAULT_REORDER_POINT
+        if item_id in previous:
+            summary["updated"] += 1
+            old_category_id, old_quantity, reorder_point = previous[item_id]
+            stats.append(
+                (
+                    old_category_id,
+                    -1,
+                    -old_quantity,
+                    -int(is_low_stock(old_quantity, reorder_point)),
+                )
+            )
+        else:
+            summary["inserted"] += 1
+        stats.append(
+            (category_id, 1, quantity, int(is_low_stock(quantity, reorder_point)))
+        )
+        values.append((item_id, name, category_id, quantity, image_path, row_version))
+        if item_id is not None:
+            # A later row for the same item in this batch updates this one
+            previous[item_id] = (category_id, quantity, reorder_point)
+
+    cursor.executemany(
+        """
+        INSERT INTO items
+        (item_id, name, category_id, quantity, image_path, row_version)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            name = VALUES(name),
+            category_id = VALUES(category_id),
+            quantity = VALUES(quantity),
+            image_path = VALUES(image_path),
+            row_version = VALUES(row_version)
+        """,
+        values,
+    )
+    if ids:
+        # Rows imported with the id of a deleted item bring it back
+        cursor.execute(
+            f"DELETE FROM tombstones WHERE table_name = 'items' "
+            f"AND row_id IN ({placeholders})",
+            tuple(ids),
+        )
+    adjust_category_stats(cursor, stats)
+    connection.commit()
+    batch.clear()
+
+
+def import_items(connection, rows, batch_size=BATCH_SIZE):
+    """Upsert items from an iterable of ``(line number, raw row)`` pairs, as
+    yielded by iter_rows, in batches.
+
+    Each batch is committed on its own, so memory use is bounded by
+    ``batch_size`` regardless of the file size. Returns a summary dict with
+    inserted/updated/rejected counts and the first rejected rows."""
+    cursor = connection.cursor()
+
+    cursor.execute("SELECT category_id, category_name FROM categories")
+    category_rows = cursor.fetchall()
+    categories = {row[1].strip().lower(): row[0] for row in category_rows}
+    # From every row: names differing only in case or spacing share a key above
+    category_ids = {row[0] for row in category_rows}
+
+    summary = {"inserted": 0, "updated": 0, "rejected": 0, "errors": []}
+    batch = []
+    pending_keys = set()
+
+    try:
+        for line, row in rows:
+            try:
+                parsed = parse_row(row, categories, category_ids)
+            except ValueError as e:
+                summary["rejected"] += 1
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"row": line, "error": str(e)})
+                continue
+
+            key = parsed[0] if parsed[0] is not None else (parsed[1], parsed[2])
+            if key in pending_keys or len(batch) >= batch_size:
+                _flush(connection, cursor, batch, summary)
+                pending_keys.clear()
+
+            batch.append(parsed)
+            pending_keys.add(key)
+
+        if batch:
+            _flush(connection, cursor, batch, summary)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return summary
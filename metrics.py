@@ -0,0 +1,273 @@
+import bisect
+import hmac
+import os
+import threading
+import time
+import weakref
+
+from flask import Response, abort, g, request
+
+from admission import detection_limiter, detection_rate_limiter
+
+# Seconds; covers cheap CRUD calls up to slow detections and reports
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+def _add_series(totals, shard):
+    for label_values, series in shard.items():
+        total = totals.setdefault(label_values, [0] * len(series))
+        for i, value in enumerate(series):
+            total[i] += value
+
+
+class _Shard:
+    """One thread's series. Only the thread-local refers to it, so it is
+    dropped, and its finalizer runs, when the thread exits."""
+
+    __slots__ = ("series", "__weakref__")
+
+    def __init__(self):
+        self.series = {}
+
+
+class _Sharded:
+    """Base for metrics recorded without locks.
+
+    Each thread updates its own dict of series; the lock is only taken the
+    first time a thread records, to register its dict, and when the thread
+    exits, to fold its dict into the totals of finished threads. A scrape
+    adds the shards up, so a value may be a few increments behind, never
+    wrong."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        # Reentrant: a finalizer may run in a thread that already holds it
+        self._lock = threading.RLock()
+
+    def _series(self, label_values):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard.series)
+            weakref.finalize(shard, self._retire, shard.series)
+        series = shard.series.get(label_values)
+        if series is None:
+            series = shard.series[label_values] = self._new_series()
+        return series
+
+    def _retire(self, shard):
+        # Servers that start a thread per request would otherwise keep one
+        # shard per request ever served
+        with self._lock:
+            self._shards = [s for s in self._shards if s is not shard]
+            _add_series(self._retired, shard)
+
+    def _merged(self):
+        with self._lock:
+            shards = list(self._shards)
+            merged = {key: list(series) for key, series in self._retired.items()}
+        for shard in shards:
+            # dict.copy() is atomic, unlike iterating a dict another thread
+            # may be adding to
+            _add_series(merged, shard.copy())
+        return merged
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def _new_series(self):
+        return [0]
+
+    def inc(self, *label_values, amount=1):
+        self._series(label_values)[0] += amount
+
+    def samples(self):
+        for label_values, (value,) in sorted(self._merged().items()):
+            yield f"{self.name}{_labels(self.labels, label_values)} {value}"
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def _new_series(self):
+        # A count per bucket (plus one above the last), then the sum
+        return [0] * (len(self.buckets) + 2)
+
+    def observe(self, value, *label_values):
+        series = self._series(label_values)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        bounds = [*(f"{b:g}" for b in self.buckets), "+Inf"]
+        for label_values, series in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                labels = _labels(self.labels, label_values, [("le", bound)])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {series[-1]:.6f}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Sampled:
+    """Value read when scraped, from ``read()``; for state other modules
+    already keep, such as the admission limiter's counters"""
+
+    def __init__(self, name, help, read, kind="gauge"):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.kind = kind
+
+    def samples(self):
+        value = self.read()
+        if value is not None:
+            yield f"{self.name} {value}"
+
+
+def _resident_memory():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route",
+    ("method", "route"),
+)
+requests_total = Counter(
+    "http_requests_total",
+    "Responses by route and status code",
+    ("method", "route", "status"),
+)
+request_db_time = Histogram(
+    "http_request_db_seconds",
+    "Time spent in database statements per request, by route",
+    ("method", "route"),
+)
+db_queries_total = Counter(
+    "db_queries_total", "Database statements run, by route", ("method", "route")
+)
+detection_stage_duration = Histogram(
+    "detection_stage_seconds",
+    "Object detection time per stage",
+    ("stage",),
+)
+report_generation_duration = Histogram(
+    "report_generation_seconds",
+    "Time to build report data on a cache miss, by report type",
+    ("report_type",),
+)
+
+REGISTRY = [
+    request_duration,
+    requests_total,
+    request_db_time,
+    db_queries_total,
+    detection_stage_duration,
+    report_generation_duration,
+    Sampled(
+        "detection_active",
+        "Detections running",
+        lambda: detection_limiter.stats()["active"],
+    ),
+    Sampled(
+        "detection_queue_depth",
+        "Detections waiting for a slot",
+        lambda: detection_limiter.stats()["queue_depth"],
+    ),
+    Sampled(
+        "detection_rejected_total",
+        "Detections turned away because the queue was full or timed out",
+        lambda: detection_limiter.rejected_queue_full
+        + detection_limiter.rejected_timeout,
+        kind="counter",
+    ),
+    Sampled(
+        "detection_rate_limited_total",
+        "Detections rejected by the per-user rate limit",
+        lambda: detection_rate_limiter.rejected,
+        kind="counter",
+    ),
+    Sampled(
+        "process_resident_memory_bytes",
+        "Resident memory of this worker process",
+        _resident_memory,
+    ),
+]
+
+
+def render():
+    """The registry in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def observe_detection(timings):
+    for stage, seconds in timings.items():
+        detection_stage_duration.observe(seconds, stage)
+
+
+def init_app(app):
+    token = app.config["METRICS_TOKEN"]
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get("request_started")
+        if started is None:
+            return response
+
+        # The rule, not the path, so /api/items/1 and /api/items/2 share series
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        request_duration.observe(time.perf_counter() - started, request.method, route)
+        requests_total.inc(request.method, route, response.status_code)
+
+        stats = g.get("sql_stats")
+        if stats is not None:
+            request_db_time.observe(stats["time"], request.method, route)
+            db_queries_total.inc(request.method, route, amount=stats["count"])
+        return response
+
+    def metrics_view():
+        if token:
+            supplied = request.headers.get("Authorization", "")
+            if not hmac.compare_digest(supplied, f"Bearer {token}"):
+                abort(401)
+        return Response(render(), mimetype="text/plain; version=0.0.4")
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
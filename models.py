@@ -2,8 +2,9 @@ from config import db
 import os
 
 
-def create_tables():
-    cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
+def create_tables(cursor=None):
+    if cursor is None:
+        cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
 
     is_postgres = os.environ.get("DATABASE_URL") is not None
 
@@ -118,10 +119,439 @@ def create_tables():
        )"""
         )
 
+    cursor.execute(
+        """
+       CREATE TABLE IF NOT EXISTS schema_version (
+           version INT NOT NULL PRIMARY KEY,
+           applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+       )"""
+    )
+
     if hasattr(db, "connection"):
         db.connection.commit()
 
 
+DEFAULT_REORDER_POINT = 10
+DEFAULT_CRITICAL_POINT = 5
+
+_CATEGORY_STATS_QUERY = """
+    SELECT c.category_id, COUNT(i.item_id), COALESCE(SUM(i.quantity), 0),
+           COUNT(CASE WHEN i.quantity <= i.reorder_point THEN 1 END)
+    FROM categories c
+    LEFT JOIN items i ON i.category_id = c.category_id
+    GROUP BY c.category_id
+"""
+
+
+def create_category_stats(cursor):
+    cursor.execute(
+        """
+       CREATE TABLE IF NOT EXISTS category_stats (
+           category_id INT PRIMARY KEY,
+           item_count INT NOT NULL DEFAULT 0,
+           total_quantity BIGINT NOT NULL DEFAULT 0,
+           low_stock_count INT NOT NULL DEFAULT 0,
+           FOREIGN KEY (category_id) REFERENCES categories(category_id)
+               ON DELETE CASCADE
+       )"""
+    )
+    # Items have no reorder_point yet at this version (see migration 4)
+    cursor.execute(
+        """
+        INSERT INTO category_stats
+        (category_id, item_count, total_quantity, low_stock_count)
+        SELECT c.category_id, COUNT(i.item_id), COALESCE(SUM(i.quantity), 0),
+               COUNT(CASE WHEN i.quantity <= 10 THEN 1 END)
+        FROM categories c
+        LEFT JOIN items i ON i.category_id = c.category_id
+        GROUP BY c.category_id
+        """
+    )
+
+
+def is_low_stock(quantity, reorder_point=DEFAULT_REORDER_POINT):
+    return int(quantity) <= int(reorder_point)
+
+
+def adjust_category_stats(cursor, deltas):
+    """Apply (category_id, item_delta, quantity_delta, low_stock_delta) rows
+    to category_stats. Runs in the caller's transaction."""
+    deltas = [delta for delta in deltas if any(delta[1:])]
+    if not deltas:
+        return
+
+    cursor.executemany(
+        """
+        INSERT INTO category_stats
+        (category_id, item_count, total_quantity, low_stock_count)
+        VALUES (%s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            item_count = item_count + VALUES(item_count),
+            total_quantity = total_quantity + VALUES(total_quantity),
+            low_stock_count = low_stock_count + VALUES(low_stock_count)
+        """,
+        deltas,
+    )
+
+
+def check_category_stats(cursor):
+    """Compare category_stats with a full recount. Returns the categories
+    whose stored row differs as (category_id, stored, actual) tuples."""
+    cursor.execute(_CATEGORY_STATS_QUERY)
+    actual = {row[0]: tuple(int(v) for v in row[1:]) for row in cursor.fetchall()}
+
+    cursor.execute(
+        "SELECT category_id, item_count, total_quantity, low_stock_count "
+        "FROM category_stats"
+    )
+    stored = {row[0]: tuple(int(v) for v in row[1:]) for row in cursor.fetchall()}
+
+    # adjust_category_stats only writes non-zero deltas, so an empty category
+    # may have no row at all; a missing row counts as zeros
+    empty = (0, 0, 0)
+    mismatches = []
+    for category_id in sorted(set(actual) | set(stored)):
+        stored_row = stored.get(category_id, empty)
+        actual_row = actual.get(category_id, empty)
+        if stored_row != actual_row:
+            mismatches.append((category_id, stored_row, actual_row))
+    return mismatches
+
+
+def rebuild_category_stats(cursor=None):
+    """Recompute category_stats from the items table."""
+    if cursor is None:
+        cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
+
+    cursor.execute("DELETE FROM category_stats")
+    cursor.execute(
+        "INSERT INTO category_stats "
+        "(category_id, item_count, total_quantity, low_stock_count) "
+        + _CATEGORY_STATS_QUERY
+    )
+
+    if hasattr(db, "connection"):
+        db.connection.commit()
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+        """,
+        (table, index),
+    )
+    return cursor.fetchone() is not None
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute(
+        """
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+        """,
+        (table, column),
+    )
+    return cursor.fetchone() is not None
+
+
+def create_transaction_daily(cursor):
+    cursor.execute(
+        """
+       CREATE TABLE IF NOT EXISTS transaction_daily (
+           transaction_date DATE NOT NULL,
+           item_id INT NOT NULL,
+           category_id INT NOT NULL,
+           transaction_type ENUM('in', 'out') NOT NULL,
+           quantity BIGINT NOT NULL DEFAULT 0,
+           transaction_count INT NOT NULL DEFAULT 0,
+           PRIMARY KEY (transaction_date, item_id, transaction_type),
+           KEY idx_transaction_daily_category (category_id, transaction_date)
+       )"""
+    )
+    # MySQL has no CREATE INDEX IF NOT EXISTS; a rerun after a partial
+    # migration must not fail on the index it already made
+    if not _index_exists(cursor, "transactions", "idx_transactions_date"):
+        cursor.execute(
+            "CREATE INDEX idx_transactions_date ON transactions (transaction_date)"
+        )
+    rebuild_transaction_daily(cursor)
+
+
+def add_transaction_rollup(cursor, movements):
+    """Add (item_id, category_id, transaction_type, quantity) movements made
+    today to transaction_daily in one statement. Runs in the caller's
+    transaction, alongside the ledger insert."""
+    totals = {}
+    for item_id, category_id, transaction_type, quantity in movements:
+        key = (item_id, category_id, transaction_type)
+        total = totals.setdefault(key, [0, 0])
+        total[0] += quantity
+        total[1] += 1
+
+    if not totals:
+        return
+
+    placeholders = ", ".join(["(CURDATE(), %s, %s, %s, %s, %s)"] * len(totals))
+    params = []
+    for (item_id, category_id, transaction_type), (quantity, count) in totals.items():
+        params.extend([item_id, category_id, transaction_type, quantity, count])
+
+    cursor.execute(
+        f"""
+        INSERT INTO transaction_daily
+        (transaction_date, item_id, category_id, transaction_type,
+         quantity, transaction_count)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            quantity = quantity + VALUES(quantity),
+            transaction_count = transaction_count + VALUES(transaction_count)
+        """,
+        tuple(params),
+    )
+
+
+def rebuild_transaction_daily(cursor=None):
+    """Recompute transaction_daily from the full transactions ledger."""
+    if cursor is None:
+        cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
+
+    cursor.execute("DELETE FROM transaction_daily")
+    cursor.execute(
+        """
+        INSERT INTO transaction_daily
+        (transaction_date, item_id, category_id, transaction_type,
+         quantity, transaction_count)
+        SELECT DATE(t.transaction_date), t.item_id, i.category_id,
+               t.transaction_type, SUM(t.quantity_change), COUNT(*)
+        FROM transactions t
+        JOIN items i ON t.item_id = i.item_id
+        GROUP BY DATE(t.transaction_date), t.item_id, i.category_id,
+                 t.transaction_type
+        """
+    )
+
+    if hasattr(db, "connection"):
+        db.connection.commit()
+
+
+def _add_missing(cursor, table, columns=(), indexes=()):
+    """ALTER ``table`` to add whichever of ``columns`` and ``indexes``
+    ((name, definition) pairs) it does not have yet, in one statement.
+
+    MySQL commits each DDL statement on its own, so a migration that fails
+    after its ALTER is rerun against a table that already has the columns."""
+    clauses = [
+        f"ADD COLUMN {name} {definition}"
+        for name, definition in columns
+        if not _column_exists(cursor, table, name)
+    ]
+    clauses += [
+        f"ADD INDEX {name} {definition}"
+        for name, definition in indexes
+        if not _index_exists(cursor, table, name)
+    ]
+    if clauses:
+        cursor.execute(f"ALTER TABLE {table} " + ", ".join(clauses))
+
+
+def add_item_stock_columns(cursor):
+    _add_missing(
+        cursor,
+        "items",
+        columns=[
+            ("last_transaction_at", "DATETIME DEFAULT NULL"),
+            ("reorder_point", f"INT NOT NULL DEFAULT {DEFAULT_REORDER_POINT}"),
+            ("critical_point", f"INT NOT NULL DEFAULT {DEFAULT_CRITICAL_POINT}"),
+            (
+                "below_reorder_point",
+                "TINYINT(1) AS (quantity <= reorder_point) STORED",
+            ),
+        ],
+        indexes=[("idx_items_below_reorder", "(below_reorder_point, quantity)")],
+    )
+    cursor.execute(
+        """
+        UPDATE items i
+        JOIN (
+            SELECT item_id, MAX(transaction_date) as last_transaction_at
+            FROM transactions
+            GROUP BY item_id
+        ) t ON t.item_id = i.item_id
+        SET i.last_transaction_at = t.last_transaction_at
+        """
+    )
+    rebuild_category_stats(cursor)
+
+
+def add_sync_columns(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sync_sequence (
+            id TINYINT PRIMARY KEY,
+            value BIGINT NOT NULL
+        )
+        """
+    )
+    # Existing rows start at version 1, so a full sync (since=0) returns them
+    cursor.execute("INSERT IGNORE INTO sync_sequence (id, value) VALUES (1, 1)")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tombstones (
+            table_name VARCHAR(32) NOT NULL,
+            row_id INT NOT NULL,
+            row_version BIGINT NOT NULL,
+            deleted_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (table_name, row_id),
+            KEY idx_tombstones_row_version (row_version)
+        )
+        """
+    )
+    # A failure partway leaves some tables altered; a rerun skips those
+    for table in ("items", "categories", "object_mappings"):
+        _add_missing(
+            cursor,
+            table,
+            columns=[
+                ("row_version", "BIGINT NOT NULL DEFAULT 1"),
+                (
+                    "updated_at",
+                    "DATETIME NOT NULL "
+                    "DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+                ),
+            ],
+            indexes=[(f"idx_{table}_row_version", "(row_version)")],
+        )
+
+
+def next_row_version(cursor):
+    """Allocate a version for the rows the current transaction writes.
+
+    Uses the LAST_INSERT_ID(expr) trick, so the new value comes back with
+    the UPDATE itself. The sequence row stays locked until commit, so versions
+    become visible in the order they were handed out and a client syncing
+    from version N never misses a later commit with a lower one. Call it
+    before the transaction's other writes; with every writer taking this lock
+    first, writers cannot deadlock on it."""
+    cursor.execute(
+        "UPDATE sync_sequence SET value = LAST_INSERT_ID(value + 1) WHERE id = 1"
+    )
+    return cursor.lastrowid
+
+
+def current_row_version(cursor):
+    """The newest row version in ``cursor``'s read snapshot, and the Unix time
+    it was allocated. Read it before a build on the same connection and it
+    describes exactly the writes that build sees."""
+    cursor.execute(
+        "SELECT value, UNIX_TIMESTAMP(updated_at) FROM sync_sequence WHERE id = 1"
+    )
+    value, updated_at = cursor.fetchone()
+    return value, float(updated_at)
+
+
+def add_tombstones(cursor, table, row_ids, row_version):
+    """Record deleted rows of a synced table for /api/sync"""
+    cursor.executemany(
+        """
+        INSERT INTO tombstones (table_name, row_id, row_version)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            row_version = VALUES(row_version),
+            deleted_at = CURRENT_TIMESTAMP
+        """,
+        [(table, row_id, row_version) for row_id in row_ids],
+    )
+
+
+def create_revoked_tokens(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS revoked_tokens (
+            jti VARCHAR(64) PRIMARY KEY,
+            token_type VARCHAR(10) NOT NULL,
+            user_id INT,
+            expires_at DATETIME NOT NULL,
+            revoked_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_revoked_tokens_expires_at (expires_at),
+            KEY idx_revoked_tokens_revoked_at (revoked_at)
+        )
+        """
+    )
+
+
+def add_sync_sequence_time(cursor):
+    # Set by MySQL on every next_row_version(), so a snapshot also knows when
+    # its newest write happened (Last-Modified of versioned lists)
+    _add_missing(
+        cursor,
+        "sync_sequence",
+        columns=[
+            (
+                "updated_at",
+                "DATETIME(6) NOT NULL "
+                "DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+            )
+        ],
+    )
+
+
+# Ordered (version, migration) pairs. Each migration receives a cursor and
+# must leave the schema at its version; migrate() records it afterwards.
+MIGRATIONS = [
+    (1, create_tables),
+    (2, create_category_stats),
+    (3, create_transaction_daily),
+    (4, add_item_stock_columns),
+    (5, add_sync_columns),
+    (6, create_revoked_tokens),
+    (7, add_sync_sequence_time),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(cursor=None):
+    """Return the schema version recorded in the database, 0 if unversioned."""
+    if cursor is None:
+        cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
+
+    try:
+        cursor.execute("SELECT MAX(version) FROM schema_version")
+        row = cursor.fetchone()
+    except Exception:
+        if hasattr(db, "connection"):
+            db.connection.rollback()
+        return 0
+
+    return row[0] or 0
+
+
+def migrate():
+    """Apply every pending migration in order. Returns the applied versions."""
+    cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
+    current = get_schema_version(cursor)
+
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+
+        print(f"Applying schema migration {version} ({migration.__name__})...")
+        migration(cursor)
+        cursor.execute(
+            "INSERT INTO schema_version (version) VALUES (%s)", (version,)
+        )
+        if hasattr(db, "connection"):
+            db.connection.commit()
+        applied.append(version)
+
+    return applied
+
+
 def get_object_mappings():
     cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
     cursor.execute(
@@ -142,6 +572,7 @@ def get_object_mappings():
 def add_object_mapping(object_name, category_id):
     try:
         cursor = db.connection.cursor() if hasattr(db, "connection") else db.cursor()
+        row_version = next_row_version(cursor)
 
         cursor.execute(
             "SELECT mapping_id FROM object_mappings WHERE object_name = %s",
@@ -151,13 +582,19 @@ def add_object_mapping(object_name, category_id):
 
         if existing:
             cursor.execute(
-                "UPDATE object_mappings SET category_id = %s WHERE object_name = %s",
-                (category_id, object_name),
+                """
+                UPDATE object_mappings SET category_id = %s, row_version = %s
+                WHERE object_name = %s
+                """,
+                (category_id, row_version, object_name),
             )
         else:
             cursor.execute(
-                "INSERT INTO object_mappings (object_name, category_id) VALUES (%s, %s)",
-                (object_name, category_id),
+                """
+                INSERT INTO object_mappings (object_name, category_id, row_version)
+                VALUES (%s, %s, %s)
+                """,
+                (object_name, category_id, row_version),
             )
 
         if hasattr(db, "connection"):
@@ -0,0 +1,143 @@
+import concurrent.futures
+import functools
+import hashlib
+import hmac
+import os
+import threading
+import time
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from admission import RateLimiter
+from config import app
+
+
+class PasswordHashBusy(Exception):
+    """Too many password hashes are already queued"""
+
+
+def busy_response(error):
+    """503 with Retry-After for a PasswordHashBusy ``error``"""
+    response = jsonify({"error": str(error)})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
+class HashPool:
+    """Runs password hashing on a few dedicated threads.
+
+    scrypt and PBKDF2 release the GIL, so a login burst would otherwise put
+    one CPU-bound hash on every worker thread at once. Bounding the threads
+    leaves CPU for the rest of the API, and bounding the queue turns an
+    overload into a fast error instead of a pile of timed-out requests."""
+
+    def __init__(self, workers, max_pending):
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashBusy("Too many logins in progress, try again shortly")
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+
+class NegativeCache:
+    """Remembers recently rejected (stored hash, password) pairs for ``ttl``
+    seconds, so a repeated wrong password is rejected without hashing it.
+
+    Entries are keyed by an HMAC under a per-process key; no password or
+    plain digest of one is kept. Including the stored hash means a password
+    change invalidates the user's entries by itself."""
+
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = os.urandom(32)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _digest(self, stored_hash, password):
+        message = f"{stored_hash}\0{password}".encode()
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def __contains__(self, pair):
+        digest = self._digest(*pair)
+        with self._lock:
+            expires = self._entries.get(digest)
+            return expires is not None and expires > time.monotonic()
+
+    def add(self, stored_hash, password):
+        if not self.ttl:
+            return
+        digest = self._digest(stored_hash, password)
+        now = time.monotonic()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries = {d: e for d, e in self._entries.items() if e > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[digest] = now + self.ttl
+
+
+pool = HashPool(
+    app.config["PASSWORD_HASH_WORKERS"], app.config["PASSWORD_HASH_MAX_PENDING"]
+)
+rejected = NegativeCache(app.config["PASSWORD_NEGATIVE_CACHE_SECONDS"])
+# Only failed attempts spend tokens, so a shift logging in from one office IP
+# is not throttled. The per-account bucket is keyed by (username, IP): keyed
+# by username alone, anyone could lock an account out with wrong passwords.
+failed_logins_by_user = RateLimiter(
+    app.config["LOGIN_FAILURES_PER_MINUTE"] / 60, app.config["LOGIN_FAILURE_BURST"]
+)
+failed_logins_by_ip = RateLimiter(
+    app.config["LOGIN_IP_FAILURES_PER_MINUTE"] / 60,
+    app.config["LOGIN_IP_FAILURE_BURST"],
+)
+
+
+def hash_password(password):
+    """Hash with the configured PASSWORD_HASH_METHOD"""
+    return pool.run(
+        generate_password_hash, password, app.config["PASSWORD_HASH_METHOD"]
+    )
+
+
+def verify_password(stored_hash, password):
+    if (stored_hash, password) in rejected:
+        return False
+    if pool.run(check_password_hash, stored_hash, password):
+        return True
+    rejected.add(stored_hash, password)
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def _current_method():
+    # werkzeug fills in defaults ("scrypt" -> "scrypt:32768:8:1"); the method
+    # recorded in a hash is the part before the first "$"
+    return hash_password("").split("$", 1)[0]
+
+
+def needs_rehash(stored_hash):
+    """Whether ``stored_hash`` was made with other hash parameters than the
+    configured ones, and should be replaced on the next successful login"""
+    return stored_hash.split("$", 1)[0] != _current_method()
+
+
+def login_retry_after(username, ip):
+    """Seconds until ``username`` from ``ip`` may try again, 0 if now"""
+    return max(
+        failed_logins_by_user.retry_after((username, ip)),
+        failed_logins_by_ip.retry_after(ip),
+    )
+
+
+def record_failed_login(username, ip):
+    failed_logins_by_user.check((username, ip))
+    failed_logins_by_ip.check(ip)
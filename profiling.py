@@ -0,0 +1,96 @@
+import cProfile
+import datetime
+import os
+import random
+import re
+import time
+import uuid
+
+from flask import g, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+
+PROFILE_PERMISSION = "profile_requests"
+
+
+def _requested_by_admin():
+    """Whether the request asks for a profile (X-Profile: 1) and its token
+    carries the profile_requests permission"""
+    if request.headers.get("X-Profile") != "1":
+        return False
+
+    from routes import has_permission
+
+    try:
+        verify_jwt_in_request(optional=True)
+        return has_permission(get_jwt().get("role"), PROFILE_PERMISSION)
+    except Exception:
+        # Bad or missing token: the view's own decorators will reject it
+        return False
+
+
+def artifact_name(method, route, duration_ms):
+    """``<time>_<method>_<route>_<ms>ms_<id>.pstats``, so listings can show
+    what was profiled without opening the file"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+    stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    return f"{stamp}_{method}_{slug}_{duration_ms:.0f}ms_{uuid.uuid4().hex[:8]}.pstats"
+
+
+def list_artifacts(directory):
+    """Saved profiles, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    entries = [e for e in os.scandir(directory) if e.name.endswith(".pstats")]
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return entries
+
+
+def _prune(directory, keep):
+    for entry in list_artifacts(directory)[keep:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def init_app(app):
+    directory = app.config["PROFILE_ARTIFACTS_DIR"]
+    sample_rate = app.config["PROFILE_SAMPLE_RATE"]
+    max_files = app.config["PROFILE_MAX_FILES"]
+
+    @app.before_request
+    def start_profile():
+        sampled = sample_rate and random.random() < sample_rate
+        if not (sampled or _requested_by_admin()):
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+
+    @app.after_request
+    def save_profile(response):
+        profiler = g.pop("profiler", None)
+        if profiler is None:
+            return response
+
+        # Streamed bodies are produced after this point and are not included
+        profiler.disable()
+        duration_ms = (time.perf_counter() - g.profile_started) * 1000
+        route = request.url_rule.rule if request.url_rule else request.path
+        name = artifact_name(request.method, route, duration_ms)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(directory, name))
+            _prune(directory, max_files)
+        except OSError as e:
+            print(f"WARNING: Could not save request profile: {e}")
+            return response
+
+        response.headers["X-Profile-Id"] = name
+        return response
@@ -0,0 +1,460 @@
+"""Report data, independent of the format it is rendered to.
+
+Each builder returns ``(Report, 200)`` or ``({"error": ...}, status)``. The
+JSON route, the file exporters and the export workers all consume the same
+Report, so nothing is serialized just to be parsed again.
+"""
+
+
+class Report:
+    """Summary metadata plus the detail rows of a report.
+
+    ``rows`` is an iterable of tuples whose values are named by ``fields``.
+    ``columns`` lists the ``(key, title)`` pairs shown in tabular exports;
+    fields outside it (e.g. ids, notes) are only part of the JSON output.
+    Rows may be a one-shot iterator such as a streaming cursor, so renderers
+    read them exactly once."""
+
+    def __init__(self, report_type, summary, chart, columns, fields, rows):
+        self.report_type = report_type
+        self.summary = summary
+        self.chart = chart
+        self.columns = columns
+        self.fields = fields
+        self.rows = rows
+
+    @property
+    def titles(self):
+        return [title for key, title in self.columns]
+
+    def iter_table(self):
+        """Yield each row's values in ``columns`` order."""
+        indexes = [self.fields.index(key) for key, title in self.columns]
+        for row in self.rows:
+            yield [row[i] for i in indexes]
+
+    def to_dict(self):
+        """The JSON shape served by /api/generate-report."""
+        return {
+            "summary": [
+                {"title": title, "value": value} for title, value in self.summary
+            ],
+            "chartData": self.chart,
+            "headers": [{"title": title, "key": key} for key, title in self.columns],
+            "items": [dict(zip(self.fields, row)) for row in self.rows],
+        }
+
+
+TRANSACTION_COLUMNS = [
+    ("id", "ID"),
+    ("item", "Item"),
+    ("type", "Type"),
+    ("quantity", "Quantity"),
+    ("date", "Date"),
+    ("user", "User"),
+]
+TRANSACTION_FIELDS = ("id", "item", "user", "type", "quantity", "date", "notes")
+
+# Type labels come out of MySQL; dates are formatted by the renderers
+_TRANSACTION_ROWS_QUERY = """
+    SELECT t.transaction_id, i.name as item_name, u.username,
+           CASE WHEN t.transaction_type = 'in' THEN 'Stock In' ELSE 'Stock Out' END,
+           t.quantity_change, t.transaction_date, t.notes
+    FROM transactions t
+    JOIN items i ON t.item_id = i.item_id
+    JOIN users u ON t.user_id = u.user_id
+    WHERE t.transaction_date >= %s AND t.transaction_date < %s
+    {type_filter}
+    ORDER BY t.transaction_date DESC
+    {limit}
+"""
+
+
+def _cursor():
+    # Imported here so the export workers can unpickle a Report without
+    # loading the Flask app and database setup.
+    from database import read_connection
+
+    return read_connection().cursor()
+
+
+def inventory_report():
+    """Generate inventory status report"""
+    cursor = _cursor()
+
+    # Totals come from the incrementally maintained category_stats table, so
+    # only one row per category is read instead of scanning items.
+    cursor.execute(
+        """
+        SELECT CAST(COALESCE(SUM(item_count), 0) AS SIGNED) as total_items,
+               SUM(total_quantity) as total_quantity,
+               CAST(COALESCE(SUM(low_stock_count), 0) AS SIGNED) as low_stock_count
+        FROM category_stats
+    """
+    )
+    summary_data = cursor.fetchone()
+
+    cursor.execute(
+        """
+        SELECT c.category_name, s.item_count, s.total_quantity
+        FROM category_stats s
+        JOIN categories c ON s.category_id = c.category_id
+        WHERE s.item_count > 0
+        ORDER BY s.item_count DESC
+    """
+    )
+    category_data = cursor.fetchall()
+
+    cursor.execute(
+        """
+        SELECT i.name, c.category_name, i.quantity
+        FROM items i
+        JOIN categories c ON i.category_id = c.category_id
+        ORDER BY i.quantity DESC
+    """
+    )
+    items_data = cursor.fetchall()
+
+    report = Report(
+        "inventory",
+        summary=[
+            ("Total Items", summary_data[0]),
+            ("Total Quantity", summary_data[1] if summary_data[1] is not None else 0),
+            ("Low Stock Items", summary_data[2]),
+        ],
+        chart={
+            "type": "bar",
+            "labels": [cat[0] for cat in category_data],
+            "datasets": [
+                {
+                    "label": "Quantity by Category",
+                    "data": [
+                        cat[2] if cat[2] is not None else 0 for cat in category_data
+                    ],
+                    "backgroundColor": "rgba(124, 77, 255, 0.7)",
+                    "borderColor": "#7c4dff",
+                    "borderWidth": 1,
+                }
+            ],
+        },
+        columns=[
+            ("name", "Item Name"),
+            ("category", "Category"),
+            ("quantity", "Quantity"),
+        ],
+        fields=("name", "category", "quantity"),
+        rows=items_data,
+    )
+
+    return report, 200
+
+
+def category_report(category_id=None):
+    """Generate category analysis report"""
+    cursor = _cursor()
+
+    if category_id:
+        cursor.execute(
+            """
+            SELECT c.category_name, s.item_count, s.total_quantity,
+                   s.total_quantity / NULLIF(s.item_count, 0) as avg_quantity
+            FROM categories c
+            LEFT JOIN category_stats s ON c.category_id = s.category_id
+            WHERE c.category_id = %s
+        """,
+            (category_id,),
+        )
+        category_info = cursor.fetchone()
+
+        if not category_info:
+            return {"error": "Category not found"}, 404
+
+        cursor.execute(
+            """
+            SELECT i.name, i.quantity
+            FROM items i
+            WHERE i.category_id = %s
+            ORDER BY i.quantity DESC
+        """,
+            (category_id,),
+        )
+        items_data = cursor.fetchall()
+
+        report = Report(
+            "category",
+            summary=[
+                ("Total Items", category_info[1] or 0),
+                ("Total Quantity", category_info[2] or 0),
+                ("Average Quantity", round(category_info[3] or 0, 2)),
+            ],
+            chart={
+                "type": "bar",
+                "labels": [item[0] for item in items_data],
+                "datasets": [
+                    {
+                        "label": f"Quantity per Item in {category_info[0]}",
+                        "data": [item[1] for item in items_data],
+                        "backgroundColor": "rgba(76, 175, 80, 0.7)",
+                        "borderColor": "#4caf50",
+                        "borderWidth": 1,
+                    }
+                ],
+            },
+            columns=[("name", "Item Name"), ("quantity", "Quantity")],
+            fields=("name", "quantity"),
+            rows=items_data,
+        )
+    else:
+        cursor.execute(
+            """
+            SELECT c.category_name, COALESCE(s.item_count, 0) as item_count,
+                   COALESCE(s.total_quantity, 0) as total_quantity
+            FROM categories c
+            LEFT JOIN category_stats s ON c.category_id = s.category_id
+            ORDER BY item_count DESC
+        """
+        )
+        categories_data = cursor.fetchall()
+
+        chart_items = [cat[1] for cat in categories_data]
+        chart_quantities = [cat[2] for cat in categories_data]
+
+        report = Report(
+            "category",
+            summary=[
+                ("Total Categories", len(categories_data)),
+                ("Total Items", sum(chart_items)),
+                ("Total Quantity", sum(chart_quantities)),
+            ],
+            chart={
+                "type": "pie",
+                "labels": [cat[0] for cat in categories_data],
+                "datasets": [
+                    {
+                        "label": "Items per Category",
+                        "data": chart_items,
+                        "backgroundColor": [
+                            "rgba(124, 77, 255, 0.7)",
+                            "rgba(76, 175, 80, 0.7)",
+                            "rgba(33, 150, 243, 0.7)",
+                            "rgba(255, 82, 82, 0.7)",
+                            "rgba(255, 193, 7, 0.7)",
+                            "rgba(0, 188, 212, 0.7)",
+                        ],
+                    }
+                ],
+            },
+            columns=[
+                ("category", "Category"),
+                ("items", "Items Count"),
+                ("quantity", "Total Quantity"),
+            ],
+            fields=("category", "items", "quantity"),
+            rows=categories_data,
+        )
+
+    return report, 200
+
+
+def transaction_report(start_date, end_date, transaction_type=None):
+    """Generate transaction history report"""
+    cursor = _cursor()
+
+    params = [start_date, end_date]
+    type_filter = ""
+    daily_type_filter = ""
+
+    if transaction_type:
+        type_filter = "AND t.transaction_type = %s"
+        daily_type_filter = "AND d.transaction_type = %s"
+        params.append(transaction_type)
+
+    # Summary and chart read the transaction_daily rollup (one row per day,
+    # item and type) instead of aggregating the ledger.
+    daily_params = [start_date.date(), end_date.date()] + params[2:]
+
+    cursor.execute(
+        f"""
+        SELECT CAST(COALESCE(SUM(d.transaction_count), 0) AS SIGNED) as total_transactions,
+               SUM(CASE WHEN d.transaction_type = 'in' THEN d.transaction_count ELSE 0 END) as stock_in_count,
+               SUM(CASE WHEN d.transaction_type = 'out' THEN d.transaction_count ELSE 0 END) as stock_out_count,
+               SUM(CASE WHEN d.transaction_type = 'in' THEN d.quantity ELSE 0 END) as total_in,
+               SUM(CASE WHEN d.transaction_type = 'out' THEN d.quantity ELSE 0 END) as total_out
+        FROM transaction_daily d
+        WHERE d.transaction_date >= %s AND d.transaction_date < %s
+        {daily_type_filter}
+    """,
+        tuple(daily_params),
+    )
+
+    summary_data = cursor.fetchone()
+
+    query = f"""
+        SELECT d.transaction_date as date,
+               SUM(CASE WHEN d.transaction_type = 'in' THEN d.quantity ELSE 0 END) as in_quantity,
+               SUM(CASE WHEN d.transaction_type = 'out' THEN d.quantity ELSE 0 END) as out_quantity
+        FROM transaction_daily d
+        WHERE d.transaction_date >= %s AND d.transaction_date < %s
+        {daily_type_filter}
+        GROUP BY d.transaction_date
+        ORDER BY date
+    """
+
+    cursor.execute(query, tuple(daily_params))
+    date_data = cursor.fetchall()
+
+    cursor.execute(
+        _TRANSACTION_ROWS_QUERY.format(type_filter=type_filter, limit="LIMIT 100"),
+        tuple(params),
+    )
+    transactions = cursor.fetchall()
+
+    report = Report(
+        "transaction",
+        summary=[
+            ("Total Transactions", summary_data[0]),
+            ("Stock In", summary_data[1]),
+            ("Stock Out", summary_data[2]),
+        ],
+        chart={
+            "type": "line",
+            "labels": [date[0] for date in date_data],
+            "datasets": [
+                {
+                    "label": "Stock In",
+                    "data": [date[1] for date in date_data],
+                    "backgroundColor": "rgba(76, 175, 80, 0.2)",
+                    "borderColor": "#4caf50",
+                    "borderWidth": 2,
+                    "tension": 0.3,
+                },
+                {
+                    "label": "Stock Out",
+                    "data": [date[2] for date in date_data],
+                    "backgroundColor": "rgba(255, 82, 82, 0.2)",
+                    "borderColor": "#ff5252",
+                    "borderWidth": 2,
+                    "tension": 0.3,
+                },
+            ],
+        },
+        columns=TRANSACTION_COLUMNS,
+        fields=TRANSACTION_FIELDS,
+        rows=transactions,
+    )
+
+    return report, 200
+
+
+def transaction_ledger(start_date, end_date, transaction_type=None, batch_size=1000):
+    """Every transaction in the range, read through a server-side cursor.
+
+    The query runs immediately (so errors surface before a response is
+    started) but rows are only fetched from MySQL as ``rows`` is consumed, in
+    batches of ``batch_size``. The summary is left empty."""
+    from database import InstrumentedSSCursor, read_connection
+
+    params = [start_date, end_date]
+    type_filter = ""
+    if transaction_type:
+        type_filter = "AND t.transaction_type = %s"
+        params.append(transaction_type)
+
+    cursor = read_connection().cursor(InstrumentedSSCursor)
+    try:
+        cursor.execute(
+            _TRANSACTION_ROWS_QUERY.format(type_filter=type_filter, limit=""),
+            tuple(params),
+        )
+    except Exception:
+        cursor.close()
+        raise
+
+    return Report(
+        "transaction",
+        summary=[],
+        chart=None,
+        columns=TRANSACTION_COLUMNS + [("notes", "Notes")],
+        fields=TRANSACTION_FIELDS,
+        rows=_iter_cursor(cursor, batch_size),
+    )
+
+
+def _iter_cursor(cursor, batch_size):
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
+
+
+def low_stock_report():
+    """Generate low stock items report"""
+    cursor = _cursor()
+
+    # Range scan on idx_items_below_reorder; last_transaction_at is kept on
+    # the item by the transaction routes, so the ledger is not touched.
+    cursor.execute(
+        """
+        SELECT i.item_id, i.name, i.quantity, c.category_name,
+               COALESCE(DATE_FORMAT(i.last_transaction_at, '%Y-%m-%d %H:%i:%s'), 'N/A'),
+               i.quantity <= i.critical_point as critical
+        FROM items i
+        JOIN categories c ON i.category_id = c.category_id
+        WHERE i.below_reorder_point = 1
+        ORDER BY i.quantity ASC
+    """
+    )
+    items_data = cursor.fetchall()
+
+    critical = [bool(item[5]) for item in items_data]
+    quantities = [item[2] for item in items_data]
+
+    report = Report(
+        "low-stock",
+        summary=[
+            ("Low Stock Items", len(items_data)),
+            ("Critical Stock", sum(critical)),
+            (
+                "Average Quantity",
+                round(sum(quantities) / len(quantities), 2) if quantities else 0,
+            ),
+        ],
+        chart={
+            "type": "bar",
+            "labels": [item[1] for item in items_data],
+            "datasets": [
+                {
+                    "label": "Quantity",
+                    "data": quantities,
+                    "backgroundColor": [
+                        "rgba(255, 82, 82, 0.7)" if c else "rgba(255, 193, 7, 0.7)"
+                        for c in critical
+                    ],
+                    "borderColor": ["#ff5252" if c else "#ffc107" for c in critical],
+                    "borderWidth": 1,
+                }
+            ],
+        },
+        columns=[
+            ("name", "Item Name"),
+            ("category", "Category"),
+            ("quantity", "Quantity"),
+            ("lastUpdated", "Last Updated"),
+        ],
+        fields=("id", "name", "quantity", "category", "lastUpdated"),
+        rows=[item[:5] for item in items_data],
+    )
+
+    return report, 200
+
+
+BUILDERS = {
+    "inventory": inventory_report,
+    "category": category_report,
+    "transaction": transaction_report,
+    "low-stock": low_stock_report,
+}
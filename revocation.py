@@ -0,0 +1,124 @@
+import threading
+import time
+
+from flask import jsonify
+
+from config import app, db
+
+
+class RevocationList:
+    """In-memory copy of the unexpired rows of ``revoked_tokens``.
+
+    Checking a token is a dict lookup. New revocations are pulled from the
+    database at most every ``sync_seconds`` by whichever request notices the
+    copy is stale; after the first full load each sync only reads rows revoked
+    since the previous one (with some overlap, so a revocation committed late
+    is not skipped). Revocations made by this process apply immediately;
+    other instances pick them up on their next sync."""
+
+    OVERLAP_SECONDS = 60
+
+    def __init__(self, sync_seconds):
+        self.sync_seconds = sync_seconds
+        self._expires = {}
+        self._since = None
+        self._synced_at = 0.0
+        self._sync_lock = threading.Lock()
+        # Guards writes; lookups read the dict without it
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        if time.monotonic() - self._synced_at >= self.sync_seconds:
+            self.sync()
+        return jti in self._expires
+
+    def add(self, jti, expires):
+        with self._lock:
+            self._expires[jti] = float(expires)
+
+    def _fetch(self, cursor):
+        if self._since is None:
+            cursor.execute(
+                """
+                SELECT jti, UNIX_TIMESTAMP(expires_at) FROM revoked_tokens
+                WHERE expires_at > NOW()
+                """
+            )
+        else:
+            cursor.execute(
+                """
+                SELECT jti, UNIX_TIMESTAMP(expires_at) FROM revoked_tokens
+                WHERE revoked_at >= FROM_UNIXTIME(%s)
+                """,
+                (self._since - self.OVERLAP_SECONDS,),
+            )
+        return cursor.fetchall()
+
+    def sync(self):
+        # One request syncs; the others keep using the current copy meanwhile
+        if not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            started = time.time()
+            # A connection of its own: reading on the request's connection
+            # would fix its REPEATABLE READ snapshot before the view runs, and
+            # the view (e.g. a cached report) would read older data than the
+            # cache versions it reads next
+            connection = db.connect
+            try:
+                rows = self._fetch(connection.cursor())
+            finally:
+                connection.close()
+
+            now = time.time()
+            with self._lock:
+                for jti, expires in rows:
+                    self._expires[jti] = float(expires)
+                # Expired tokens are rejected by their signature check anyway
+                for jti in [j for j, e in self._expires.items() if e <= now]:
+                    del self._expires[jti]
+            self._since = started
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            # Keep serving from the copy we have and retry after another
+            # interval, rather than on every request while the database is down
+            self._synced_at = time.monotonic()
+            print(f"WARNING: Could not sync revoked tokens: {e}")
+        finally:
+            self._sync_lock.release()
+
+
+revoked = RevocationList(app.config["TOKEN_REVOCATION_SYNC_SECONDS"])
+PRUNE_BATCH_SIZE = 1000
+
+
+def revoke_token(claims):
+    """Revoke the token with the decoded ``claims`` until it expires"""
+    cursor = db.connection.cursor()
+    # Expired rows reject nothing; clearing a batch on each revocation keeps
+    # the table (and every instance's full load) bounded
+    cursor.execute(
+        "DELETE FROM revoked_tokens WHERE expires_at < NOW() LIMIT %s",
+        (PRUNE_BATCH_SIZE,),
+    )
+    cursor.execute(
+        """
+        INSERT IGNORE INTO revoked_tokens (jti, token_type, user_id, expires_at)
+        VALUES (%s, %s, %s, FROM_UNIXTIME(%s))
+        """,
+        (claims["jti"], claims["type"], claims["sub"], claims["exp"]),
+    )
+    db.connection.commit()
+    revoked.add(claims["jti"], claims["exp"])
+
+
+def init_app(jwt):
+    @jwt.token_in_blocklist_loader
+    def is_token_revoked(jwt_header, jwt_payload):
+        # Runs inside jwt_required(), so permission_required, role_required
+        # and every other protected route reject revoked tokens
+        return jwt_payload["jti"] in revoked
+
+    @jwt.revoked_token_loader
+    def revoked_token_response(jwt_header, jwt_payload):
+        return jsonify({"error": "Token has been revoked"}), 401
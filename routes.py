@@ -1,23 +1,36 @@
-from flask import Blueprint, request, jsonify, send_file, send_from_directory, current_app, abort
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask import Blueprint, request, jsonify, send_file, send_from_directory, current_app, abort, Response, stream_with_context
+from flask_jwt_extended import (
+    create_access_token,
+    get_jwt,
+    get_jwt_identity,
+    get_jwt_request_location,
+    jwt_required,
+)
 from config import db
-from werkzeug.security import check_password_hash, generate_password_hash
+from admission import admission_controlled, detection_limiter, detection_rate_limiter
+from auth import STREAM_SCOPE
+from cache import bump_version, cached_report, get_versions, versioned
+from database import read_connection
+from events import publish_event, stream_changes, stream_limiter
+from metrics import report_generation_duration
+from reports import BUILDERS, transaction_ledger
+from streaming import iter_csv, iter_gzip
+from models import (
+    DEFAULT_CRITICAL_POINT,
+    DEFAULT_REORDER_POINT,
+    adjust_category_stats,
+    add_tombstones,
+    add_transaction_rollup,
+    is_low_stock,
+    next_row_version,
+)
+from passwords import PasswordHashBusy, busy_response, hash_password, verify_password
 import re
 import os
 import functools
-import csv
-import io
 import datetime
-import matplotlib
-
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import pandas as pd
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from ai.process import process_image
+import json
+import time
 
 api_routes = Blueprint("api_routes", __name__)
 
@@ -44,6 +57,7 @@ PERMISSIONS = {
         "view_reports",
         "generate_report",
         "use_ai_detection",
+        "profile_requests",
     ],
     "staff": [
         "view_dashboard",
@@ -67,19 +81,21 @@ PERMISSIONS = {
 }
 
 
-def permission_required(permission):
+def has_permission(role, permission):
+    return role in PERMISSIONS and permission in PERMISSIONS[role]
+
+
+def permission_required(permission, locations=None):
     def decorator(func):
         @functools.wraps(func)
-        @jwt_required()
+        @jwt_required(locations=locations)
         def wrapper(*args, **kwargs):
             claims = get_jwt()
 
             if "role" not in claims:
                 return jsonify({"error": "Invalid token"}), 422
 
-            role = claims["role"]
-
-            if role not in PERMISSIONS or permission not in PERMISSIONS[role]:
+            if not has_permission(claims["role"], permission):
                 return (
                     jsonify(
                         {
@@ -157,6 +173,7 @@ def get_permissions():
 # AI object detection endpoint
 @api_routes.route("/api/detect-objects", methods=["POST"])
 @role_required(["admin", "staff"])
+@admission_controlled(detection_limiter, detection_rate_limiter)
 def detect_objects():
     if request.method == "OPTIONS":
         response = jsonify({})
@@ -167,9 +184,23 @@ def detect_objects():
         response.headers.add("Access-Control-Allow-Methods", "POST,OPTIONS")
         return response
 
+    # cv2/numpy and the detector are only loaded once detection is first used
+    from ai.process import process_image
+
     return process_image()
 
 
+# Detection queue depth and rejection counters (admin)
+@api_routes.route("/api/detect-objects/stats", methods=["GET"])
+@role_required(["admin"])
+def detection_stats():
+    stats = detection_limiter.stats()
+    rate_stats = detection_rate_limiter.stats()
+    stats["rate_limited_users"] = rate_stats["tracked_keys"]
+    stats["rejected_rate_limited"] = rate_stats["rejected"]
+    return jsonify(stats), 200
+
+
 # Serve result images
 @api_routes.route("/api/images/<filename>", methods=["GET"])
 def serve_image(filename):
@@ -200,13 +231,19 @@ def serve_image(filename):
 
 # ----- Item Routes -----
 
+ITEM_COLUMNS = (
+    "item_id, name, category_id, quantity, image_path, "
+    "reorder_point, critical_point, last_transaction_at"
+)
+
 
 # Public endpoint for items (read-only)
 @api_routes.route("/api/items", methods=["GET"])
+@versioned("items")
 def get_items():
     try:
-        cursor = db.connection.cursor()
-        cursor.execute("SELECT * FROM items")
+        cursor = read_connection().cursor()
+        cursor.execute(f"SELECT {ITEM_COLUMNS} FROM items")
         items = cursor.fetchall()
 
         results = [
@@ -216,6 +253,9 @@ def get_items():
                 "category_id": item[2],
                 "quantity": item[3],
                 "image_path": item[4],
+                "reorder_point": item[5],
+                "critical_point": item[6],
+                "last_transaction_at": item[7],
             }
             for item in items
         ]
@@ -230,7 +270,9 @@ def get_items():
 def get_item(item_id):
     try:
         cursor = db.connection.cursor()
-        cursor.execute("SELECT * FROM items WHERE item_id = %s", (item_id,))
+        cursor.execute(
+            f"SELECT {ITEM_COLUMNS} FROM items WHERE item_id = %s", (item_id,)
+        )
         item = cursor.fetchone()
 
         if not item:
@@ -242,6 +284,9 @@ def get_item(item_id):
             "category_id": item[2],
             "quantity": item[3],
             "image_path": item[4],
+            "reorder_point": item[5],
+            "critical_point": item[6],
+            "last_transaction_at": item[7],
         }
 
         return jsonify(result), 200
@@ -263,25 +308,91 @@ def add_item():
         if "quantity" not in data:
             return jsonify({"error": "Quantity is required"}), 400
 
+        reorder_point = data.get("reorder_point", DEFAULT_REORDER_POINT)
+        critical_point = data.get("critical_point", DEFAULT_CRITICAL_POINT)
+
         cursor = db.connection.cursor()
+        row_version = next_row_version(cursor)
         cursor.execute(
-            "INSERT INTO items (name, category_id, quantity, image_path) VALUES (%s, %s, %s, %s)",
+            """
+            INSERT INTO items
+            (name, category_id, quantity, image_path, reorder_point, critical_point,
+             row_version)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
             (
                 data["name"],
                 data["category_id"],
                 data["quantity"],
                 data.get("image_path"),
+                reorder_point,
+                critical_point,
+                row_version,
             ),
         )
 
         item_id = cursor.lastrowid
+        adjust_category_stats(
+            cursor,
+            [
+                (
+                    data["category_id"],
+                    1,
+                    int(data["quantity"]),
+                    int(is_low_stock(data["quantity"], reorder_point)),
+                )
+            ],
+        )
         db.connection.commit()
+        bump_version("items")
+        publish_event(
+            "item.created",
+            {
+                "item_id": item_id,
+                "name": data["name"],
+                "category_id": data["category_id"],
+                "quantity": data["quantity"],
+                "image_path": data.get("image_path"),
+                "reorder_point": reorder_point,
+                "critical_point": critical_point,
+            },
+        )
 
         return jsonify({"message": "Item added successfully", "item_id": item_id}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# Import items from a CSV or XLSX file (admin and staff)
+@api_routes.route("/api/items/import", methods=["POST"])
+@role_required(["admin", "staff"])
+def import_items():
+    try:
+        if "file" not in request.files:
+            return jsonify({"error": "No file part"}), 400
+
+        file = request.files["file"]
+        if file.filename == "":
+            return jsonify({"error": "No selected file"}), 400
+
+        if not file.filename.lower().endswith((".csv", ".xlsx")):
+            return jsonify({"error": "File type not allowed"}), 400
+
+        from importer import import_items as run_import, iter_rows
+
+        try:
+            summary = run_import(db.connection, iter_rows(file))
+        finally:
+            # Batches are committed as they go, so even a failed import may
+            # have changed items
+            bump_version("items")
+            publish_event("items.imported", {})
+
+        return jsonify({"message": "Import finished", **summary}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # Update an item (admin and staff)
 @api_routes.route("/api/items/<int:item_id>", methods=["PUT"])
 @role_required(["admin", "staff"])
@@ -290,23 +401,70 @@ def update_item(item_id):
         data = request.get_json()
 
         cursor = db.connection.cursor()
-        cursor.execute("SELECT * FROM items WHERE item_id = %s", (item_id,))
+        # Locked, so the category_stats deltas below use the current values
+        row_version = next_row_version(cursor)
+        cursor.execute(
+            f"SELECT {ITEM_COLUMNS} FROM items WHERE item_id = %s FOR UPDATE",
+            (item_id,),
+        )
         current_item = cursor.fetchone()
 
         if not current_item:
+            db.connection.rollback()
             return jsonify({"error": "Item not found"}), 404
 
+        reorder_point = data.get("reorder_point", current_item[5])
+        critical_point = data.get("critical_point", current_item[6])
+
         cursor.execute(
-            "UPDATE items SET name = %s, category_id = %s, quantity = %s, image_path = %s WHERE item_id = %s",
+            """
+            UPDATE items
+            SET name = %s, category_id = %s, quantity = %s, image_path = %s,
+                reorder_point = %s, critical_point = %s, row_version = %s
+            WHERE item_id = %s
+            """,
             (
                 data["name"],
                 data["category_id"],
                 data["quantity"],
                 data.get("image_path"),
+                reorder_point,
+                critical_point,
+                row_version,
                 item_id,
             ),
         )
+        adjust_category_stats(
+            cursor,
+            [
+                (
+                    current_item[2],
+                    -1,
+                    -current_item[3],
+                    -int(is_low_stock(current_item[3], current_item[5])),
+                ),
+                (
+                    data["category_id"],
+                    1,
+                    int(data["quantity"]),
+                    int(is_low_stock(data["quantity"], reorder_point)),
+                ),
+            ],
+        )
         db.connection.commit()
+        bump_version("items")
+        publish_event(
+            "item.updated",
+            {
+                "item_id": item_id,
+                "name": data["name"],
+                "category_id": data["category_id"],
+                "quantity": data["quantity"],
+                "image_path": data.get("image_path"),
+                "reorder_point": reorder_point,
+                "critical_point": critical_point,
+            },
+        )
         return jsonify({"message": "Item updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -318,16 +476,23 @@ def update_item(item_id):
 def delete_item(item_id):
     try:
         cursor = db.connection.cursor()
+        row_version = next_row_version(cursor)
 
-        # Check if the item exists
-        cursor.execute("SELECT * FROM items WHERE item_id = %s", (item_id,))
+        # Check if the item exists; locked so category_stats gets its current
+        # quantity
+        cursor.execute(
+            f"SELECT {ITEM_COLUMNS} FROM items WHERE item_id = %s FOR UPDATE",
+            (item_id,),
+        )
         item = cursor.fetchone()
         if not item:
+            db.connection.rollback()
             return jsonify({"error": "Item not found"}), 404
 
         cursor.execute("SELECT * FROM transactions WHERE item_id = %s", (item_id,))
         transaction = cursor.fetchone()
         if transaction:
+            db.connection.rollback()
             return (
                 jsonify(
                     {"error": "Cannot delete item, it is referenced in transactions"}
@@ -337,7 +502,13 @@ def delete_item(item_id):
 
         # Delete the item
         cursor.execute("DELETE FROM items WHERE item_id = %s", (item_id,))
+        add_tombstones(cursor, "items", [item_id], row_version)
+        adjust_category_stats(
+            cursor, [(item[2], -1, -item[3], -int(is_low_stock(item[3], item[5])))]
+        )
         db.connection.commit()
+        bump_version("items")
+        publish_event("item.deleted", {"item_id": item_id})
         return jsonify({"message": "Item deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -368,6 +539,7 @@ def add_mapping():
         success = add_object_mapping(data["object_name"], data["category_id"])
 
         if success:
+            bump_version("object_mappings")
             return jsonify({"message": "Mapping added successfully"}), 201
         else:
             return jsonify({"error": "Failed to add mapping"}), 500
@@ -380,9 +552,10 @@ def add_mapping():
 
 # Public endpoint for categories (read-only)
 @api_routes.route("/api/categories", methods=["GET"])
+@versioned("categories")
 def get_categories():
     try:
-        cursor = db.connection.cursor()
+        cursor = read_connection().cursor()
         cursor.execute("SELECT * FROM categories")
         categories = cursor.fetchall()
 
@@ -404,12 +577,18 @@ def add_category():
             return jsonify({"error": "Missing category_name"}), 400
 
         cursor = db.connection.cursor()
+        row_version = next_row_version(cursor)
         cursor.execute(
-            "INSERT INTO categories (category_name) VALUES (%s)",
-            (data["category_name"],),
+            "INSERT INTO categories (category_name, row_version) VALUES (%s, %s)",
+            (data["category_name"], row_version),
         )
         category_id = cursor.lastrowid
         db.connection.commit()
+        bump_version("categories")
+        publish_event(
+            "category.created",
+            {"category_id": category_id, "category_name": data["category_name"]},
+        )
 
         return (
             jsonify(
@@ -431,11 +610,20 @@ def update_category(category_id):
             return jsonify({"error": "Missing category_name"}), 400
 
         cursor = db.connection.cursor()
+        row_version = next_row_version(cursor)
         cursor.execute(
-            "UPDATE categories SET category_name = %s WHERE category_id = %s",
-            (data["category_name"], category_id),
+            """
+            UPDATE categories SET category_name = %s, row_version = %s
+            WHERE category_id = %s
+            """,
+            (data["category_name"], row_version, category_id),
         )
         db.connection.commit()
+        bump_version("categories")
+        publish_event(
+            "category.updated",
+            {"category_id": category_id, "category_name": data["category_name"]},
+        )
         return jsonify({"message": "Category updated successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -464,13 +652,249 @@ def delete_category(category_id):
                 400,
             )
 
+        row_version = next_row_version(cursor)
         cursor.execute("DELETE FROM categories WHERE category_id = %s", (category_id,))
+        add_tombstones(cursor, "categories", [category_id], row_version)
         db.connection.commit()
+        bump_version("categories")
+        publish_event("category.deleted", {"category_id": category_id})
         return jsonify({"message": "Category deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ----- Sync -----
+
+
+@api_routes.route("/api/sync", methods=["GET"])
+@permission_required("view_inventory")
+def sync_changes():
+    """Rows of items, categories and object mappings changed after version
+    ``since``, and the ids deleted since then. Clients store the returned
+    ``version`` and pass it as ``since`` next time; ``since=0`` is a full sync.
+    ``reset`` is true when ``since`` is unknown to this database: the response
+    is then a full sync and the client must drop its local rows first."""
+    try:
+        since = int(request.args.get("since", 0))
+    except ValueError:
+        return jsonify({"error": "since must be a number"}), 400
+
+    try:
+        cursor = read_connection().cursor()
+        # Versions become visible in order, so nothing at or below this one
+        # can still appear after it is read
+        cursor.execute("SELECT value FROM sync_sequence WHERE id = 1")
+        version = cursor.fetchone()[0]
+        # The client synced against another database (or a restored one);
+        # merging a delta into its store would keep rows that no longer exist
+        reset = since > version
+        if reset:
+            since = 0
+
+        cursor.execute(
+            f"""
+            SELECT {ITEM_COLUMNS}, row_version, updated_at FROM items
+            WHERE row_version > %s AND row_version <= %s ORDER BY row_version
+            """,
+            (since, version),
+        )
+        items = [
+            {
+                "item_id": item[0],
+                "name": item[1],
+                "category_id": item[2],
+                "quantity": item[3],
+                "image_path": item[4],
+                "reorder_point": item[5],
+                "critical_point": item[6],
+                "last_transaction_at": item[7],
+                "row_version": item[8],
+                "updated_at": item[9],
+            }
+            for item in cursor.fetchall()
+        ]
+
+        cursor.execute(
+            """
+            SELECT category_id, category_name, row_version, updated_at
+            FROM categories
+            WHERE row_version > %s AND row_version <= %s ORDER BY row_version
+            """,
+            (since, version),
+        )
+        categories = [
+            {
+                "category_id": row[0],
+                "category_name": row[1],
+                "row_version": row[2],
+                "updated_at": row[3],
+            }
+            for row in cursor.fetchall()
+        ]
+
+        cursor.execute(
+            """
+            SELECT mapping_id, object_name, category_id, row_version, updated_at
+            FROM object_mappings
+            WHERE row_version > %s AND row_version <= %s ORDER BY row_version
+            """,
+            (since, version),
+        )
+        mappings = [
+            {
+                "mapping_id": row[0],
+                "object_name": row[1],
+                "category_id": row[2],
+                "row_version": row[3],
+                "updated_at": row[4],
+            }
+            for row in cursor.fetchall()
+        ]
+
+        deleted = {"items": [], "categories": [], "object_mappings": []}
+        if since:
+            # A full sync has nothing to delete on the client
+            cursor.execute(
+                """
+                SELECT table_name, row_id FROM tombstones
+                WHERE row_version > %s AND row_version <= %s ORDER BY row_version
+                """,
+                (since, version),
+            )
+            for table_name, row_id in cursor.fetchall():
+                deleted[table_name].append(row_id)
+
+        return (
+            jsonify(
+                {
+                    "version": version,
+                    "reset": reset,
+                    "items": items,
+                    "categories": categories,
+                    "object_mappings": mappings,
+                    "deleted": deleted,
+                }
+            ),
+            200,
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ----- Change Feed -----
+
+
+@api_routes.route("/api/stream/token", methods=["POST"])
+@permission_required("view_inventory")
+def issue_stream_token():
+    """Short-lived token for opening the change feed from a browser
+    EventSource, which cannot send an Authorization header. Pass it as
+    ``?token=``; it is accepted by /api/stream/changes only."""
+    claims = get_jwt()
+    expires_in = current_app.config["EVENTS_TOKEN_SECONDS"]
+    token = create_access_token(
+        identity=get_jwt_identity(),
+        additional_claims={
+            "username": claims.get("username"),
+            "role": claims["role"],
+            "scope": STREAM_SCOPE,
+        },
+        expires_delta=datetime.timedelta(seconds=expires_in),
+    )
+    return jsonify({"token": token, "expires_in": expires_in}), 200
+
+
+@api_routes.route("/api/stream/changes", methods=["GET"])
+@permission_required("view_inventory", locations=["headers", "query_string"])
+def stream_change_feed():
+    """Server-Sent Events stream of committed item, category and transaction
+    changes. Reconnecting clients resume from Last-Event-ID; a ``reset``
+    event means the gap was too large and lists should be reloaded."""
+    if (
+        get_jwt_request_location() == "query_string"
+        and get_jwt().get("scope") != STREAM_SCOPE
+    ):
+        # URLs end up in access logs; only the short-lived stream token goes there
+        return jsonify({"error": "Use a token from /api/stream/token"}), 401
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+        "lastEventId"
+    )
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    heartbeat = current_app.config["EVENTS_HEARTBEAT_SECONDS"]
+    # Each open stream holds a worker thread for its whole lifetime
+    if not stream_limiter.acquire():
+        response = jsonify({"error": "Too many open change streams, try again later"})
+        response.headers["Retry-After"] = str(max(1, round(heartbeat)))
+        return response, 503
+
+    started = time.monotonic()
+    response = Response(
+        stream_changes(
+            last_event_id, heartbeat, current_app.config["EVENTS_MAX_STREAM_SECONDS"]
+        ),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Runs when the server closes the response, including on client disconnect
+    response.call_on_close(lambda: stream_limiter.release(time.monotonic() - started))
+    return response
+
+
+# ----- Profiling -----
+
+
+# Saved request profiles, newest first (admin)
+@api_routes.route("/api/admin/profiles", methods=["GET"])
+@permission_required("profile_requests")
+def get_profiles():
+    try:
+        from profiling import list_artifacts
+
+        profiles = [
+            {
+                "id": entry.name,
+                "size": entry.stat().st_size,
+                "created_at": datetime.datetime.fromtimestamp(entry.stat().st_mtime),
+                "download_url": f"/api/admin/profiles/{entry.name}",
+            }
+            for entry in list_artifacts(current_app.config["PROFILE_ARTIFACTS_DIR"])
+        ]
+        return jsonify(profiles), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# Download a profile as a pstats file, or ?format=text for the top functions
+@api_routes.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+@permission_required("profile_requests")
+def download_profile(profile_id):
+    directory = os.path.abspath(current_app.config["PROFILE_ARTIFACTS_DIR"])
+    if not profile_id.endswith(".pstats"):
+        abort(404)
+
+    if request.args.get("format") == "text":
+        import io
+        import pstats
+
+        path = os.path.join(directory, os.path.basename(profile_id))
+        if not os.path.isfile(path):
+            abort(404)
+        sort = request.args.get("sort", "cumulative")
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            return jsonify({"error": "Invalid sort key"}), 400
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.sort_stats(sort).print_stats(50)
+        return Response(output.getvalue(), mimetype="text/plain")
+
+    return send_from_directory(directory, profile_id, as_attachment=True)
+
+
 # ----- User Routes -----
 
 
@@ -510,15 +934,20 @@ def add_user():
         if validation_error:
             return jsonify({"errors": {"password": [validation_error]}}), 422
 
-        hashed_password = generate_password_hash(data["password"])
+        hashed_password = hash_password(data["password"])
         cursor = db.connection.cursor()
+        # Usernames appear in transaction reports, which are cached by row version
+        next_row_version(cursor)
         cursor.execute(
             "INSERT INTO users (username, password, role) VALUES (%s, %s, %s)",
             (data["username"], hashed_password, data["role"]),
         )
         db.connection.commit()
+        bump_version("users")
 
         return jsonify({"message": "User created successfully."}), 201
+    except PasswordHashBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -542,7 +971,7 @@ def update_user(user_id):
                 return jsonify({"errors": {"password": validation_error}}), 422
 
             updates.append("password = %s")
-            params.append(generate_password_hash(data["password"]))
+            params.append(hash_password(data["password"]))
 
         if "role" in data:
             updates.append("role = %s")
@@ -552,11 +981,15 @@ def update_user(user_id):
             query = f"UPDATE users SET {', '.join(updates)} WHERE user_id = %s"
             params.append(user_id)
             cursor = db.connection.cursor()
+            next_row_version(cursor)
             cursor.execute(query, tuple(params))
             db.connection.commit()
+            bump_version("users")
 
         return jsonify({"message": "User updated successfully"}), 200
 
+    except PasswordHashBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -585,14 +1018,14 @@ def update_user_password(user_id):
             
         current_password_hash = user[0]
         
-        if not check_password_hash(current_password_hash, data["currentPassword"]):
+        if not verify_password(current_password_hash, data["currentPassword"]):
             return jsonify({"error": "Current password is incorrect"}), 401
 
         validation_error = validate_password(data["newPassword"])
         if validation_error:
             return jsonify({"error": validation_error}), 422
 
-        new_password_hash = generate_password_hash(data["newPassword"])
+        new_password_hash = hash_password(data["newPassword"])
         cursor.execute(
             "UPDATE users SET password = %s WHERE user_id = %s",
             (new_password_hash, user_id)
@@ -600,6 +1033,8 @@ def update_user_password(user_id):
         db.connection.commit()
         
         return jsonify({"message": "Password updated successfully"}), 200
+    except PasswordHashBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -611,7 +1046,7 @@ def update_user_password(user_id):
 @role_required(["admin", "staff"])
 def get_transactions():
     try:
-        cursor = db.connection.cursor()
+        cursor = read_connection().cursor()
         cursor.execute(
             """
             SELECT t.transaction_id, t.item_id, t.user_id, t.transaction_type, 
@@ -630,7 +1065,7 @@ def get_transactions():
                 "user_id": t[2],
                 "transaction_type": t[3],
                 "quantity_change": t[4],
-                "transaction_date": str(t[5]),
+                "transaction_date": t[5],
                 "notes": t[6],
                 "username": t[7],
             }
@@ -670,31 +1105,42 @@ def add_transaction():
 
         cursor = db.connection.cursor() if hasattr(db, 'connection') else db.cursor()
 
-        cursor.execute(
-            "SELECT quantity FROM items WHERE item_id = %s", (data["item_id"],)
-        )
-        item = cursor.fetchone()
+        try:
+            # The sequence lock comes first, as in every writer; the item row is
+            # then locked so the quantity and category_stats deltas computed
+            # below cannot be overtaken by a concurrent transaction.
+            row_version = next_row_version(cursor)
+            cursor.execute(
+                "SELECT quantity, category_id, reorder_point FROM items "
+                "WHERE item_id = %s FOR UPDATE",
+                (data["item_id"],),
+            )
+            item = cursor.fetchone()
 
-        if not item:
-            return jsonify({"error": "Item not found"}), 404
+            if not item:
+                db.connection.rollback()
+                return jsonify({"error": "Item not found"}), 404
 
-        current_quantity = item[0]
+            current_quantity = item[0]
 
-        if data["transaction_type"] == "out" and quantity > current_quantity:
-            return (
-                jsonify(
-                    {"error": f"Not enough stock. Current quantity: {current_quantity}"}
-                ),
-                400,
-            )
+            if data["transaction_type"] == "out" and quantity > current_quantity:
+                db.connection.rollback()
+                return (
+                    jsonify(
+                        {
+                            "error": "Not enough stock. Current quantity: "
+                            f"{current_quantity}"
+                        }
+                    ),
+                    400,
+                )
 
-        new_quantity = (
-            current_quantity + quantity
-            if data["transaction_type"] == "in"
-            else current_quantity - quantity
-        )
+            new_quantity = (
+                current_quantity + quantity
+                if data["transaction_type"] == "in"
+                else current_quantity - quantity
+            )
 
-        try:
             cursor.execute(
                 """
                 INSERT INTO transactions 
@@ -709,14 +1155,49 @@ def add_transaction():
                     data.get("notes"),
                 ),
             )
+            transaction_id = cursor.lastrowid
 
             cursor.execute(
-                "UPDATE items SET quantity = %s WHERE item_id = %s",
-                (new_quantity, data["item_id"]),
+                """
+                UPDATE items
+                SET quantity = %s, last_transaction_at = NOW(), row_version = %s
+                WHERE item_id = %s
+                """,
+                (new_quantity, row_version, data["item_id"]),
+            )
+
+            adjust_category_stats(
+                cursor,
+                [
+                    (
+                        item[1],
+                        0,
+                        new_quantity - current_quantity,
+                        int(is_low_stock(new_quantity, item[2]))
+                        - int(is_low_stock(current_quantity, item[2])),
+                    )
+                ],
+            )
+            add_transaction_rollup(
+                cursor,
+                [(data["item_id"], item[1], data["transaction_type"], quantity)],
             )
 
             if hasattr(db, 'connection') and hasattr(db.connection, 'commit'):
                 db.connection.commit()
+            bump_version("transactions", "items")
+            publish_event(
+                "transaction.created",
+                {
+                    "transaction_id": transaction_id,
+                    "item_id": data["item_id"],
+                    "transaction_type": data["transaction_type"],
+                    "quantity_change": quantity,
+                },
+            )
+            publish_event(
+                "item.quantity", {"item_id": data["item_id"], "quantity": new_quantity}
+            )
 
             return jsonify({"message": "Transaction added successfully"}), 201
             
@@ -729,6 +1210,196 @@ def add_transaction():
         return jsonify({"error": str(e)}), 500
 
 
+# Add many transactions at once (all-or-nothing)
+@api_routes.route("/api/transactions/bulk", methods=["POST"])
+@role_required(["admin", "staff"])
+def add_transactions_bulk():
+    try:
+        data = request.json
+        user_id = get_jwt_identity()
+
+        movements = data.get("transactions") if isinstance(data, dict) else data
+        if not isinstance(movements, list) or not movements:
+            return jsonify({"error": "Expected a non-empty list of transactions"}), 400
+
+        errors = []
+        rows = []
+        for index, movement in enumerate(movements):
+            if not isinstance(movement, dict) or not all(
+                k in movement for k in ["item_id", "transaction_type", "quantity_change"]
+            ):
+                errors.append({"index": index, "error": "Missing required fields"})
+                continue
+
+            if movement["transaction_type"] not in ["in", "out"]:
+                errors.append(
+                    {
+                        "index": index,
+                        "error": "Invalid transaction type. Must be 'in' or 'out'",
+                    }
+                )
+                continue
+
+            try:
+                item_id = int(movement["item_id"])
+                quantity = int(movement["quantity_change"])
+            except (TypeError, ValueError):
+                errors.append(
+                    {"index": index, "error": "Item ID and quantity must be numbers"}
+                )
+                continue
+
+            if quantity <= 0:
+                errors.append({"index": index, "error": "Quantity must be positive"})
+                continue
+
+            rows.append(
+                (
+                    index,
+                    item_id,
+                    movement["transaction_type"],
+                    quantity,
+                    movement.get("notes"),
+                )
+            )
+
+        if errors:
+            return jsonify({"error": "Validation failed", "errors": errors}), 400
+
+        cursor = db.connection.cursor()
+
+        try:
+            item_ids = sorted({row[1] for row in rows})
+            placeholders = ", ".join(["%s"] * len(item_ids))
+            row_version = next_row_version(cursor)
+
+            # Lock every affected item once so the stock checks below stay valid
+            # until the batch is committed.
+            cursor.execute(
+                f"SELECT item_id, quantity, category_id, reorder_point FROM items "
+                f"WHERE item_id IN ({placeholders}) FOR UPDATE",
+                tuple(item_ids),
+            )
+            locked = cursor.fetchall()
+            stock = {row[0]: row[1] for row in locked}
+            item_categories = {row[0]: row[2] for row in locked}
+            reorder_points = {row[0]: row[3] for row in locked}
+
+            # Apply the movements in order so an "out" can use stock received
+            # earlier in the same batch.
+            deltas = {}
+            for index, item_id, transaction_type, quantity, _ in rows:
+                if item_id not in stock:
+                    errors.append({"index": index, "error": "Item not found"})
+                    continue
+
+                balance = stock[item_id] + deltas.get(item_id, 0)
+                if transaction_type == "out" and quantity > balance:
+                    errors.append(
+                        {
+                            "index": index,
+                            "error": f"Not enough stock. Current quantity: {balance}",
+                        }
+                    )
+                    continue
+
+                deltas[item_id] = deltas.get(item_id, 0) + (
+                    quantity if transaction_type == "in" else -quantity
+                )
+
+            if errors:
+                db.connection.rollback()
+                return jsonify({"error": "Validation failed", "errors": errors}), 400
+
+            cursor.executemany(
+                """
+                INSERT INTO transactions
+                (item_id, user_id, transaction_type, quantity_change, notes)
+                VALUES (%s, %s, %s, %s, %s)
+                """,
+                [
+                    (item_id, user_id, transaction_type, quantity, notes)
+                    for _, item_id, transaction_type, quantity, notes in rows
+                ],
+            )
+            add_transaction_rollup(
+                cursor,
+                [
+                    (item_id, item_categories[item_id], transaction_type, quantity)
+                    for _, item_id, transaction_type, quantity, _ in rows
+                ],
+            )
+
+            # Every moved item gets its last_transaction_at bumped, even when
+            # its movements cancel out; only net changes touch the quantity.
+            changed = [item_id for item_id in item_ids if deltas.get(item_id)]
+            quantity_expression = "quantity"
+            if changed:
+                cases = " ".join(["WHEN %s THEN %s"] * len(changed))
+                quantity_expression = f"quantity + CASE item_id {cases} ELSE 0 END"
+            params = [
+                value for item_id in changed for value in (item_id, deltas[item_id])
+            ]
+            params.append(row_version)
+            params.extend(item_ids)
+            cursor.execute(
+                f"""
+                UPDATE items
+                SET quantity = {quantity_expression},
+                    last_transaction_at = NOW(),
+                    row_version = %s
+                WHERE item_id IN ({placeholders})
+                """,
+                tuple(params),
+            )
+
+            adjust_category_stats(
+                cursor,
+                [
+                    (
+                        item_categories[item_id],
+                        0,
+                        deltas[item_id],
+                        int(
+                            is_low_stock(
+                                stock[item_id] + deltas[item_id],
+                                reorder_points[item_id],
+                            )
+                        )
+                        - int(is_low_stock(stock[item_id], reorder_points[item_id])),
+                    )
+                    for item_id in changed
+                ],
+            )
+
+            db.connection.commit()
+            bump_version("transactions", "items")
+            publish_event("transactions.bulk", {"count": len(rows)})
+            for item_id in changed:
+                publish_event(
+                    "item.quantity",
+                    {"item_id": item_id, "quantity": stock[item_id] + deltas[item_id]},
+                )
+
+            return (
+                jsonify(
+                    {
+                        "message": "Transactions added successfully",
+                        "count": len(rows),
+                        "items_updated": len(changed),
+                    }
+                ),
+                201,
+            )
+
+        except Exception as e:
+            db.connection.rollback()
+            raise e
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # Get transaction by ID
 @api_routes.route("/api/transactions/<int:transaction_id>", methods=["GET"])
 @role_required(["admin", "staff"])
@@ -759,7 +1430,7 @@ def get_transaction(transaction_id):
             "user_id": transaction[2],
             "transaction_type": transaction[3],
             "quantity_change": transaction[4],
-            "transaction_date": str(transaction[5]),
+            "transaction_date": transaction[5],
             "notes": transaction[6],
             "username": transaction[7],
             "item_name": transaction[8],
@@ -773,13 +1444,23 @@ def get_transaction(transaction_id):
 # ----- Report Routes -----
 
 
-@api_routes.route("/api/generate-report", methods=["GET"])
-@permission_required("generate_report")
-def generate_report():
-    try:
-        report_type = request.args.get("reportType", "inventory")
-        start_date = request.args.get("startDate")
-        end_date = request.args.get("endDate")
+REPORT_TABLES = {
+    "inventory": ("items", "categories"),
+    "category": ("items", "categories"),
+    "transaction": ("transactions", "items", "users"),
+    "low-stock": ("items", "categories"),
+}
+
+
+def parse_report_params(report_type, args):
+    """Turn request arguments into the keyword arguments of the report's
+    generator, normalized so equivalent requests produce equal params."""
+    params = {}
+    if report_type == "category":
+        params["category_id"] = args.get("categoryId")
+    elif report_type == "transaction":
+        start_date = args.get("startDate")
+        end_date = args.get("endDate")
 
         if start_date:
             start_date = datetime.datetime.strptime(start_date, "%Y-%m-%d")
@@ -791,615 +1472,233 @@ def generate_report():
         else:
             end_date = datetime.datetime.now()
 
-        end_date = end_date + datetime.timedelta(days=1)
-
-        if report_type == "inventory":
-            return generate_inventory_report()
-        elif report_type == "category":
-            category_id = request.args.get("categoryId")
-            return generate_category_report(category_id)
-        elif report_type == "transaction":
-            transaction_type = request.args.get("transactionType")
-            return generate_transaction_report(start_date, end_date, transaction_type)
-        elif report_type == "low-stock":
-            return generate_low_stock_report()
-        else:
-            return jsonify({"error": "Invalid report type"}), 400
+        # Whole days, so "last 30 days" requests share a cache entry
+        params["start_date"] = datetime.datetime.combine(
+            start_date.date(), datetime.time()
+        )
+        params["end_date"] = datetime.datetime.combine(
+            end_date.date() + datetime.timedelta(days=1), datetime.time()
+        )
+        params["transaction_type"] = args.get("transactionType")
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    return params
 
 
-@api_routes.route("/api/download-report", methods=["GET"])
+def get_report_data(report_type, params):
+    """Return (Report, status) for a report, served from the report cache while
+    the tables it reads are unchanged."""
+    if report_type not in REPORT_TABLES:
+        return {"error": "Invalid report type"}, 400
+
+    def build():
+        started = time.perf_counter()
+        try:
+            return BUILDERS[report_type](**params)
+        finally:
+            report_generation_duration.observe(
+                time.perf_counter() - started, report_type
+            )
+
+    return cached_report(report_type, params, REPORT_TABLES[report_type], build)
+
+
+@api_routes.route("/api/generate-report", methods=["GET"])
 @permission_required("generate_report")
-def download_report():
+def generate_report():
     try:
         report_type = request.args.get("reportType", "inventory")
-        format_type = request.args.get("format", "pdf")
+        params = parse_report_params(report_type, request.args)
+        report, status = get_report_data(report_type, params)
+        if status != 200:
+            return jsonify(report), status
 
-        if report_type == "inventory":
-            response, _ = generate_inventory_report()
-        elif report_type == "category":
-            category_id = request.args.get("categoryId")
-            response, _ = generate_category_report(category_id)
-        elif report_type == "transaction":
-            start_date = request.args.get("startDate")
-            end_date = request.args.get("endDate")
-            transaction_type = request.args.get("transactionType")
-
-            if start_date:
-                start_date = datetime.datetime.strptime(start_date, "%Y-%m-%d")
-            else:
-                start_date = datetime.datetime.now() - datetime.timedelta(days=30)
-
-            if end_date:
-                end_date = datetime.datetime.strptime(end_date, "%Y-%m-%d")
-            else:
-                end_date = datetime.datetime.now()
-
-            response, _ = generate_transaction_report(
-                start_date, end_date, transaction_type
-            )
-        elif report_type == "low-stock":
-            response, _ = generate_low_stock_report()
-        else:
-            return jsonify({"error": "Invalid report type"}), 400
-
-        if format_type == "pdf":
-            return generate_pdf_report(response.json, report_type)
-        elif format_type == "excel":
-            return generate_excel_report(response.json, report_type)
-        elif format_type == "csv":
-            return generate_csv_report(response.json, report_type)
-        else:
-            return jsonify({"error": "Invalid format type"}), 400
+        return jsonify(report.to_dict()), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-def generate_inventory_report():
-    """Generate inventory status report"""
-    cursor = db.connection.cursor()
+def submit_report_export(report_type, format_type, params, report):
+    """Queue ``report`` for rendering in the export pool and return the job"""
+    import export_jobs
+    from exporters import report_filename
 
-    cursor.execute(
-        """
-        SELECT COUNT(*) as total_items, 
-               SUM(quantity) as total_quantity,
-               COUNT(CASE WHEN quantity <= 10 THEN 1 END) as low_stock_count
-        FROM items
-    """
-    )
-    summary_data = cursor.fetchone()
-
-    cursor.execute(
-        """
-        SELECT c.category_name, COUNT(i.item_id) as item_count, SUM(i.quantity) as total_quantity
-        FROM items i
-        JOIN categories c ON i.category_id = c.category_id
-        GROUP BY c.category_id, c.category_name
-        ORDER BY item_count DESC
-    """
+    # Identical requests against unchanged data share one job
+    versions = get_versions(REPORT_TABLES[report_type])
+    key = json.dumps(
+        [report_type, format_type, params, versions], sort_keys=True, default=str
     )
-    category_data = cursor.fetchall()
-
-    cursor.execute(
-        """
-        SELECT i.name, i.quantity, c.category_name
-        FROM items i
-        JOIN categories c ON i.category_id = c.category_id
-        ORDER BY i.quantity DESC
-    """
+    return export_jobs.submit_export(
+        key,
+        report,
+        format_type,
+        report_filename(report_type, format_type),
     )
-    items_data = cursor.fetchall()
 
-    chart_labels = [cat[0] for cat in category_data]
-    chart_values = [cat[2] if cat[2] is not None else 0 for cat in category_data]
 
-    response = {
-        "summary": [
-            {"title": "Total Items", "value": summary_data[0]},
-            {
-                "title": "Total Quantity",
-                "value": summary_data[1] if summary_data[1] is not None else 0,
-            },
-            {"title": "Low Stock Items", "value": summary_data[2]},
-        ],
-        "chartData": {
-            "type": "bar",
-            "labels": chart_labels,
-            "datasets": [
-                {
-                    "label": "Quantity by Category",
-                    "data": chart_values,
-                    "backgroundColor": "rgba(124, 77, 255, 0.7)",
-                    "borderColor": "#7c4dff",
-                    "borderWidth": 1,
-                }
-            ],
-        },
-        "headers": [
-            {"title": "Item Name", "key": "name"},
-            {"title": "Category", "key": "category"},
-            {"title": "Quantity", "key": "quantity"},
-        ],
-        "items": [
-            {"name": item[0], "category": item[2], "quantity": item[1]}
-            for item in items_data
-        ],
-    }
-
-    return jsonify(response), 200
-
-
-def generate_category_report(category_id=None):
-    """Generate category analysis report"""
-    cursor = db.connection.cursor()
-
-    if category_id:
-        cursor.execute(
-            """
-            SELECT c.category_name, COUNT(i.item_id) as item_count, 
-                   SUM(i.quantity) as total_quantity,
-                   AVG(i.quantity) as avg_quantity
-            FROM categories c
-            LEFT JOIN items i ON c.category_id = i.category_id
-            WHERE c.category_id = %s
-            GROUP BY c.category_id, c.category_name
-        """,
-            (category_id,),
-        )
-        category_info = cursor.fetchone()
-
-        if not category_info:
-            return jsonify({"error": "Category not found"}), 404
-
-        cursor.execute(
-            """
-            SELECT i.name, i.quantity
-            FROM items i
-            WHERE i.category_id = %s
-            ORDER BY i.quantity DESC
-        """,
-            (category_id,),
-        )
-        items_data = cursor.fetchall()
-
-        quantities = [item[1] for item in items_data]
-        item_names = [item[0] for item in items_data]
-
-        response = {
-            "summary": [
-                {"title": "Total Items", "value": category_info[1] or 0},
-                {"title": "Total Quantity", "value": category_info[2] or 0},
-                {"title": "Average Quantity", "value": round(category_info[3] or 0, 2)},
-            ],
-            "chartData": {
-                "type": "bar",
-                "labels": item_names,
-                "datasets": [
-                    {
-                        "label": f"Quantity per Item in {category_info[0]}",
-                        "data": quantities,
-                        "backgroundColor": "rgba(76, 175, 80, 0.7)",
-                        "borderColor": "#4caf50",
-                        "borderWidth": 1,
-                    }
-                ],
-            },
-            "headers": [
-                {"title": "Item Name", "key": "name"},
-                {"title": "Quantity", "key": "quantity"},
-            ],
-            "items": [{"name": item[0], "quantity": item[1]} for item in items_data],
-        }
-    else:
-        cursor.execute(
-            """
-            SELECT c.category_name, COUNT(i.item_id) as item_count, 
-                   SUM(i.quantity) as total_quantity
-            FROM categories c
-            LEFT JOIN items i ON c.category_id = i.category_id
-            GROUP BY c.category_id, c.category_name
-            ORDER BY item_count DESC
-        """
-        )
-        categories_data = cursor.fetchall()
+def send_export(job):
+    """Send a finished export job's file as a download"""
+    from exporters import FORMATS
 
-        chart_labels = [cat[0] for cat in categories_data]
-        chart_items = [cat[1] for cat in categories_data]
-        chart_quantities = [cat[2] or 0 for cat in categories_data]
+    if job["future"].exception() is not None:
+        return jsonify({"error": str(job["future"].exception())}), 500
 
-        response = {
-            "summary": [
-                {"title": "Total Categories", "value": len(categories_data)},
-                {"title": "Total Items", "value": sum(chart_items)},
-                {"title": "Total Quantity", "value": sum(chart_quantities)},
-            ],
-            "chartData": {
-                "type": "pie",
-                "labels": chart_labels,
-                "datasets": [
-                    {
-                        "label": "Items per Category",
-                        "data": chart_items,
-                        "backgroundColor": [
-                            "rgba(124, 77, 255, 0.7)",
-                            "rgba(76, 175, 80, 0.7)",
-                            "rgba(33, 150, 243, 0.7)",
-                            "rgba(255, 82, 82, 0.7)",
-                            "rgba(255, 193, 7, 0.7)",
-                            "rgba(0, 188, 212, 0.7)",
-                        ],
-                    }
-                ],
-            },
-            "headers": [
-                {"title": "Category", "key": "category"},
-                {"title": "Items Count", "key": "items"},
-                {"title": "Total Quantity", "key": "quantity"},
-            ],
-            "items": [
-                {"category": cat[0], "items": cat[1], "quantity": cat[2] or 0}
-                for cat in categories_data
-            ],
-        }
+    return send_file(
+        os.path.abspath(job["path"]),
+        as_attachment=True,
+        download_name=job["filename"],
+        mimetype=FORMATS[job["format"]][1],
+    )
 
-    return jsonify(response), 200
 
+@api_routes.route("/api/download-report", methods=["GET"])
+@permission_required("generate_report")
+def download_report():
+    try:
+        report_type = request.args.get("reportType", "inventory")
+        format_type = request.args.get("format", "pdf")
 
-def generate_transaction_report(start_date, end_date, transaction_type=None):
-    """Generate transaction history report"""
-    cursor = db.connection.cursor()
+        if format_type not in ["pdf", "excel", "csv"]:
+            return jsonify({"error": "Invalid format type"}), 400
 
-    params = [start_date, end_date]
-    type_filter = ""
+        params = parse_report_params(report_type, request.args)
+        report, status = get_report_data(report_type, params)
+        if status != 200:
+            return jsonify(report), status
 
-    if transaction_type:
-        type_filter = "AND t.transaction_type = %s"
-        params.append(transaction_type)
+        if format_type == "pdf":
+            # PDF layout and chart rendering are the slow part, so they run in
+            # the export pool; small reports still come back in this response.
+            import export_jobs
 
-    cursor.execute(
-        f"""
-        SELECT COUNT(*) as total_transactions,
-               SUM(CASE WHEN t.transaction_type = 'in' THEN 1 ELSE 0 END) as stock_in_count,
-               SUM(CASE WHEN t.transaction_type = 'out' THEN 1 ELSE 0 END) as stock_out_count,
-               SUM(CASE WHEN t.transaction_type = 'in' THEN t.quantity_change ELSE 0 END) as total_in,
-               SUM(CASE WHEN t.transaction_type = 'out' THEN t.quantity_change ELSE 0 END) as total_out
-        FROM transactions t
-        WHERE t.transaction_date BETWEEN %s AND %s
-        {type_filter}
-    """,
-        tuple(params),
-    )
+            job = submit_report_export(report_type, format_type, params, report)
+            if not export_jobs.wait_for_job(
+                job, current_app.config["PDF_INLINE_WAIT_SECONDS"]
+            ):
+                result = export_jobs.describe_job(job)
+                result["status_url"] = f"/api/reports/exports/{job['id']}"
+                return jsonify(result), 202
+            return send_export(job)
 
-    summary_data = cursor.fetchone()
-
-    query = f"""
-        SELECT DATE(t.transaction_date) as date,
-               SUM(CASE WHEN t.transaction_type = 'in' THEN t.quantity_change ELSE 0 END) as in_quantity,
-               SUM(CASE WHEN t.transaction_type = 'out' THEN t.quantity_change ELSE 0 END) as out_quantity
-        FROM transactions t
-        WHERE t.transaction_date BETWEEN %s AND %s
-        {type_filter}
-        GROUP BY DATE(t.transaction_date)
-        ORDER BY date
-    """
-
-    cursor.execute(query, tuple(params))
-    date_data = cursor.fetchall()
-
-    query = f"""
-        SELECT t.transaction_id, i.name as item_name, u.username, 
-               t.transaction_type, t.quantity_change, t.transaction_date, t.notes
-        FROM transactions t
-        JOIN items i ON t.item_id = i.item_id
-        JOIN users u ON t.user_id = u.user_id
-        WHERE t.transaction_date BETWEEN %s AND %s
-        {type_filter}
-        ORDER BY t.transaction_date DESC
-        LIMIT 100
-    """
-
-    cursor.execute(query, tuple(params))
-    transactions = cursor.fetchall()
-
-    chart_labels = [str(date[0]) for date in date_data]
-    in_data = [date[1] for date in date_data]
-    out_data = [date[2] for date in date_data]
-
-    response = {
-        "summary": [
-            {"title": "Total Transactions", "value": summary_data[0]},
-            {"title": "Stock In", "value": summary_data[1]},
-            {"title": "Stock Out", "value": summary_data[2]},
-        ],
-        "chartData": {
-            "type": "line",
-            "labels": chart_labels,
-            "datasets": [
-                {
-                    "label": "Stock In",
-                    "data": in_data,
-                    "backgroundColor": "rgba(76, 175, 80, 0.2)",
-                    "borderColor": "#4caf50",
-                    "borderWidth": 2,
-                    "tension": 0.3,
-                },
-                {
-                    "label": "Stock Out",
-                    "data": out_data,
-                    "backgroundColor": "rgba(255, 82, 82, 0.2)",
-                    "borderColor": "#ff5252",
-                    "borderWidth": 2,
-                    "tension": 0.3,
-                },
-            ],
-        },
-        "headers": [
-            {"title": "ID", "key": "id"},
-            {"title": "Item", "key": "item"},
-            {"title": "Type", "key": "type"},
-            {"title": "Quantity", "key": "quantity"},
-            {"title": "Date", "key": "date"},
-            {"title": "User", "key": "user"},
-        ],
-        "items": [
-            {
-                "id": t[0],
-                "item": t[1],
-                "user": t[2],
-                "type": "Stock In" if t[3] == "in" else "Stock Out",
-                "quantity": t[4],
-                "date": t[5].strftime("%Y-%m-%d %H:%M:%S"),
-                "notes": t[6],
-            }
-            for t in transactions
-        ],
-    }
+        # reportlab, xlsxwriter and matplotlib are only loaded once a report is
+        # first downloaded (or pre-warmed at startup, see app.py)
+        from exporters import send_report
 
-    return jsonify(response), 200
+        return send_report(report, format_type)
 
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-def generate_low_stock_report():
-    """Generate low stock items report"""
-    cursor = db.connection.cursor()
 
-    cursor.execute(
-        """
-        SELECT i.item_id, i.name, i.quantity, c.category_name,
-               (SELECT MAX(t.transaction_date) FROM transactions t WHERE t.item_id = i.item_id) as last_updated
-        FROM items i
-        JOIN categories c ON i.category_id = c.category_id
-        WHERE i.quantity <= 10
-        ORDER BY i.quantity ASC
-    """
-    )
-    items_data = cursor.fetchall()
+@api_routes.route("/api/reports/transactions.csv", methods=["GET"])
+@permission_required("generate_report")
+def export_transactions_csv():
+    """Stream the full transaction ledger for a date range as CSV.
 
-    total_low_stock = len(items_data)
-    critical_stock = len([item for item in items_data if item[2] <= 5])
+    Rows are read from a server-side cursor and written to the response as
+    they arrive, so memory use does not grow with the range. ``compress=gzip``
+    returns a gzipped file instead."""
+    try:
+        compress = request.args.get("compress")
+        if compress not in (None, "", "gzip"):
+            return jsonify({"error": "Invalid compression"}), 400
 
-    items = [item[1] for item in items_data]
-    quantities = [item[2] for item in items_data]
+        params = parse_report_params("transaction", request.args)
+        report = transaction_ledger(**params)
 
-    response = {
-        "summary": [
-            {"title": "Low Stock Items", "value": total_low_stock},
-            {"title": "Critical Stock", "value": critical_stock},
-            {
-                "title": "Average Quantity",
-                "value": (
-                    round(sum(quantities) / len(quantities), 2) if quantities else 0
-                ),
+        chunks = iter_csv(report.titles, report.iter_table())
+        filename = "transactions-{}-{}.csv".format(
+            params["start_date"].strftime("%Y%m%d"),
+            (params["end_date"] - datetime.timedelta(days=1)).strftime("%Y%m%d"),
+        )
+        mimetype = "text/csv"
+        if compress == "gzip":
+            chunks = iter_gzip(chunks, current_app.config["COMPRESSION_GZIP_LEVEL"])
+            filename += ".gz"
+            mimetype = "application/gzip"
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                # Let proxies pass chunks through instead of buffering them
+                "X-Accel-Buffering": "no",
             },
-        ],
-        "chartData": {
-            "type": "bar",
-            "labels": items,
-            "datasets": [
-                {
-                    "label": "Quantity",
-                    "data": quantities,
-                    "backgroundColor": [
-                        "rgba(255, 82, 82, 0.7)" if q <= 5 else "rgba(255, 193, 7, 0.7)"
-                        for q in quantities
-                    ],
-                    "borderColor": [
-                        "#ff5252" if q <= 5 else "#ffc107" for q in quantities
-                    ],
-                    "borderWidth": 1,
-                }
-            ],
-        },
-        "headers": [
-            {"title": "Item Name", "key": "name"},
-            {"title": "Category", "key": "category"},
-            {"title": "Quantity", "key": "quantity"},
-            {"title": "Last Updated", "key": "lastUpdated"},
-        ],
-        "items": [
-            {
-                "id": item[0],
-                "name": item[1],
-                "quantity": item[2],
-                "category": item[3],
-                "lastUpdated": (
-                    item[4].strftime("%Y-%m-%d %H:%M:%S") if item[4] else "N/A"
-                ),
-            }
-            for item in items_data
-        ],
-    }
-
-    return jsonify(response), 200
-
-
-def generate_pdf_report(data, report_type):
-    """Generate PDF report"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = styles["Heading1"]
-    subtitle_style = styles["Heading2"]
-    normal_style = styles["Normal"]
-
-    title = "Inventory System Report"
-    if report_type == "inventory":
-        title = "Inventory Status Report"
-    elif report_type == "category":
-        title = "Category Analysis Report"
-    elif report_type == "transaction":
-        title = "Transaction History Report"
-    elif report_type == "low-stock":
-        title = "Low Stock Alert Report"
-
-    elements.append(Paragraph(title, title_style))
-    elements.append(
-        Paragraph(
-            f"Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            normal_style,
         )
-    )
 
-    elements.append(Paragraph("Summary", subtitle_style))
-    summary_data = []
-    for item in data["summary"]:
-        summary_data.append([item["title"], str(item["value"])])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-    summary_table = Table(summary_data, colWidths=[300, 200])
-    summary_table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, -1), "#f5f5f5"),
-                ("TEXTCOLOR", (0, 0), (-1, -1), "#333333"),
-                ("ALIGN", (0, 0), (-1, -1), "LEFT"),
-                ("FONTNAME", (0, 0), (-1, -1), "Helvetica"),
-                ("FONTSIZE", (0, 0), (-1, -1), 10),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-                ("GRID", (0, 0), (-1, -1), 1, "#888888"),
-            ]
-        )
-    )
-    elements.append(summary_table)
-
-    if "items" in data and data["items"]:
-        elements.append(Paragraph("Details", subtitle_style))
-
-        header_row = [h["title"] for h in data["headers"]]
-        table_data = [header_row]
-
-        for item in data["items"]:
-            row = []
-            for h in data["headers"]:
-                key = h["key"]
-                if key in item:
-                    row.append(str(item[key]))
-                else:
-                    row.append("")
-            table_data.append(row)
-
-        details_table = Table(table_data[:101], colWidths=[120] * len(header_row))
-        details_table.setStyle(
-            TableStyle(
-                [
-                    ("BACKGROUND", (0, 0), (-1, 0), "#7c4dff"),
-                    ("TEXTCOLOR", (0, 0), (-1, 0), "#ffffff"),
-                    ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                    ("FONTSIZE", (0, 0), (-1, 0), 10),
-                    ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-                    ("BACKGROUND", (0, 1), (-1, -1), "#f9f9f9"),
-                    ("GRID", (0, 0), (-1, -1), 1, "#888888"),
-                ]
-            )
-        )
-        elements.append(details_table)
 
-        if len(data["items"]) > 100:
-            elements.append(
-                Paragraph(f"Showing 100 of {len(data['items'])} items", normal_style)
-            )
+@api_routes.route("/api/reports/transactions.xlsx", methods=["GET"])
+@permission_required("generate_report")
+def export_transactions_excel():
+    """The full transaction ledger for a date range as an Excel file.
 
-    doc.build(elements)
-    buffer.seek(0)
+    Rows go from a server-side cursor straight into the workbook, so memory
+    use does not grow with the range; the file is assembled on disk and sent
+    once complete, since an xlsx cannot be sent before it is finished."""
+    try:
+        params = parse_report_params("transaction", request.args)
+        report = transaction_ledger(**params)
 
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"{report_type}-report-{datetime.datetime.now().strftime('%Y%m%d')}.pdf",
-        mimetype="application/pdf",
-    )
+        filename = "transactions-{}-{}.xlsx".format(
+            params["start_date"].strftime("%Y%m%d"),
+            (params["end_date"] - datetime.timedelta(days=1)).strftime("%Y%m%d"),
+        )
 
+        from exporters import send_report_file
 
-def generate_excel_report(data, report_type):
-    """Generate Excel report"""
-    buffer = io.BytesIO()
+        return send_report_file(report, "excel", filename)
 
-    writer = pd.ExcelWriter(buffer, engine="xlsxwriter")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-    summary_df = pd.DataFrame(
-        [{"Metric": item["title"], "Value": item["value"]} for item in data["summary"]]
-    )
 
-    if "items" in data and data["items"]:
-        details_df = pd.DataFrame(data["items"])
-    else:
-        details_df = pd.DataFrame()
+@api_routes.route("/api/reports/exports", methods=["POST"])
+@permission_required("generate_report")
+def create_report_export():
+    try:
+        args = request.get_json(silent=True) or request.args
+        report_type = args.get("reportType", "inventory")
+        format_type = args.get("format", "pdf")
 
-    summary_df.to_excel(writer, sheet_name="Summary", index=False)
+        if format_type not in ["pdf", "excel", "csv"]:
+            return jsonify({"error": "Invalid format type"}), 400
 
-    if not details_df.empty:
-        details_df.to_excel(writer, sheet_name="Details", index=False)
+        params = parse_report_params(report_type, args)
+        report, status = get_report_data(report_type, params)
+        if status != 200:
+            return jsonify(report), status
 
-    writer.close()
-    buffer.seek(0)
+        import export_jobs
 
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name=f"{report_type}-report-{datetime.datetime.now().strftime('%Y%m%d')}.xlsx",
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+        job = submit_report_export(report_type, format_type, params, report)
+        result = export_jobs.describe_job(job)
+        result["status_url"] = f"/api/reports/exports/{job['id']}"
+        return jsonify(result), 202
 
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-def generate_csv_report(data, report_type):
-    """Generate CSV report"""
-    buffer = io.StringIO()
-    writer = csv.writer(buffer)
 
-    writer.writerow([f"{report_type.capitalize()} Report"])
-    writer.writerow(
-        [f"Generated on {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
-    )
-    writer.writerow([])
+@api_routes.route("/api/reports/exports/<job_id>", methods=["GET"])
+@permission_required("generate_report")
+def get_report_export(job_id):
+    try:
+        import export_jobs
 
-    writer.writerow(["Summary"])
-    for item in data["summary"]:
-        writer.writerow([item["title"], item["value"]])
-    writer.writerow([])
+        job = export_jobs.get_job(job_id)
+        if not job:
+            return jsonify({"error": "Export not found or expired"}), 404
 
-    if "items" in data and data["items"]:
-        headers = [h["title"] for h in data["headers"]]
-        writer.writerow(headers)
+        result = export_jobs.describe_job(job)
+        if result["status"] != "finished":
+            return jsonify(result), 200
 
-        for item in data["items"]:
-            row = []
-            for h in data["headers"]:
-                key = h["key"]
-                if key in item:
-                    row.append(item[key])
-                else:
-                    row.append("")
-            writer.writerow(row)
+        return send_export(job)
 
-    buffer.seek(0)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-    return send_file(
-        io.BytesIO(buffer.getvalue().encode()),
-        as_attachment=True,
-        download_name=f"{report_type}-report-{datetime.datetime.now().strftime('%Y%m%d')}.csv",
-        mimetype="text/csv",
-    )
\ No newline at end of file
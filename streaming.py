@@ -0,0 +1,47 @@
+import csv
+import io
+import zlib
+
+CHUNK_ROWS = 1000
+
+
+def iter_csv(header, rows, chunk_rows=CHUNK_ROWS):
+    """Yield UTF-8 encoded CSV for ``header`` and ``rows``, ``chunk_rows``
+    rows at a time, without holding more than one chunk in memory."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_compressor(level=6):
+    """A zlib compressor that writes a gzip file"""
+    # wbits=31 writes a gzip header and trailer instead of a raw zlib stream
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def iter_compressed(chunks, compressor):
+    """Compress a stream of byte chunks on the fly with ``compressor``, any
+    object with zlib's compress/flush interface"""
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_gzip(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly."""
+    return iter_compressed(chunks, gzip_compressor(level))
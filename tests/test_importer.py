@@ -0,0 +1,128 @@
+"""parse_row(), iter_rows() and import_items(), with a stand-in connection."""
+
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from importer import import_items, iter_rows, parse_row
+
+CATEGORIES = {"tools": 1, "paint": 2}
+CATEGORY_IDS = {1, 2}
+
+
+class StandInCursor:
+    """Answers the statements import_items() runs against a fixed set of
+    categories and no existing items."""
+
+    def __init__(self, categories):
+        self.categories = categories
+        self.written = []
+        self.lastrowid = None
+        self._result = []
+
+    def execute(self, query, args=None):
+        if "FROM categories" in query:
+            self._result = list(self.categories)
+        elif "sync_sequence" in query:
+            self.lastrowid = 2
+        else:
+            self._result = []
+
+    def executemany(self, query, args):
+        if "INSERT INTO items" in query:
+            self.written.extend(args)
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, categories):
+        self.cursor_ = StandInCursor(categories)
+        self.commits = 0
+
+    def cursor(self):
+        return self.cursor_
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def test_parse_row_by_category_name():
+    row = {"name": " Hammer ", "category": "Tools", "quantity": "3"}
+    assert parse_row(row, CATEGORIES, CATEGORY_IDS) == (None, "Hammer", 1, 3, None)
+
+
+def test_parse_row_by_category_id_and_item_id():
+    row = {"item_id": "7", "name": "Brush", "category_id": "2.0", "quantity": ""}
+    assert parse_row(row, CATEGORIES, CATEGORY_IDS) == (7, "Brush", 2, 0, None)
+
+
+@pytest.mark.parametrize(
+    "row, message",
+    [
+        ({"category": "Tools"}, "Item name is required"),
+        ({"name": "Saw"}, "Category is required"),
+        ({"name": "Saw", "category": "Garden"}, "Category not found: Garden"),
+        ({"name": "Saw", "category_id": "9"}, "Category not found: 9"),
+        ({"name": "Saw", "category_id": "x"}, "Invalid category_id: x"),
+        ({"name": "Saw", "category": "Tools", "quantity": "-1"}, "negative"),
+        ({"name": "Saw", "category": "Tools", "quantity": "lots"}, "Invalid quantity"),
+    ],
+)
+def test_parse_row_rejects(row, message):
+    with pytest.raises(ValueError, match=message):
+        parse_row(row, CATEGORIES, CATEGORY_IDS)
+
+
+def test_import_accepts_every_category_id_when_names_collide():
+    # Both names lower-case to "tools"; only one can be found by name, but
+    # either id must be accepted
+    connection = StandInConnection([(1, "Tools"), (2, "tools ")])
+    rows = [
+        (2, {"name": "Hammer", "category_id": "1"}),
+        (3, {"name": "Saw", "category_id": "2"}),
+    ]
+
+    summary = import_items(connection, rows)
+
+    assert summary["rejected"] == 0
+    assert summary["inserted"] == 2
+    assert [row[2] for row in connection.cursor_.written] == [1, 2]
+
+
+def csv_upload(text):
+    return FileStorage(io.BytesIO(text.encode()), filename="items.csv")
+
+
+def test_iter_rows_counts_blank_lines():
+    upload = csv_upload(
+        "name,category,quantity\n"
+        "Hammer,Tools,1\n"
+        "\n"
+        ",,\n"
+        "Saw,Tools,2\n"
+    )
+    assert [line for line, row in iter_rows(upload)] == [2, 5]
+
+
+def test_import_reports_file_line_numbers():
+    upload = csv_upload(
+        "name,category,quantity\n"
+        "Hammer,Tools,1\n"
+        "\n"
+        "Saw,Garden,2\n"
+    )
+    connection = StandInConnection([(1, "Tools")])
+
+    summary = import_items(connection, iter_rows(upload))
+
+    assert summary["inserted"] == 1
+    assert summary["errors"] == [{"row": 4, "error": "Category not found: Garden"}]
@@ -0,0 +1,87 @@
+"""read_connection() routing, with stand-ins for the primary and replica."""
+
+import MySQLdb
+import pytest
+
+import database
+from config import app
+
+
+class StandInMySQL:
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+        self.connects = 0
+
+    @property
+    def connection(self):
+        self.connects += 1
+        if self.fail:
+            raise MySQLdb.Error(f"Can't connect to {self.name}")
+        return self.name
+
+
+@pytest.fixture
+def primary(monkeypatch):
+    primary = StandInMySQL("primary")
+    monkeypatch.setattr(database, "db", primary)
+    return primary
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    replica = StandInMySQL("replica")
+    monkeypatch.setattr(database, "replica_db", replica)
+    monkeypatch.setattr(database, "_replica_down_until", 0.0)
+    monkeypatch.setattr(database, "_last_writes", {})
+    monkeypatch.setattr(database, "_current_user", lambda: "7")
+    return replica
+
+
+@pytest.fixture
+def app_context():
+    with app.app_context():
+        yield
+
+
+def test_reads_go_to_replica(primary, replica, app_context):
+    assert database.read_connection() == "replica"
+
+
+def test_primary_when_no_replica_configured(primary, monkeypatch, app_context):
+    monkeypatch.setattr(database, "replica_db", None)
+    assert database.read_connection() == "primary"
+
+
+def test_read_after_write_window(primary, replica, monkeypatch, app_context):
+    monkeypatch.setitem(app.config, "REPLICA_READ_AFTER_WRITE_SECONDS", 5)
+    now = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+
+    database.note_write("7")
+    assert database.read_connection() == "primary"
+
+    # Other users are not pinned by this user's write
+    monkeypatch.setattr(database, "_current_user", lambda: "8")
+    assert database.read_connection() == "replica"
+
+    monkeypatch.setattr(database, "_current_user", lambda: "7")
+    now[0] += 5
+    assert database.read_connection() == "replica"
+
+
+def test_replica_failure_backs_off(primary, replica, monkeypatch, app_context):
+    monkeypatch.setitem(app.config, "REPLICA_RETRY_SECONDS", 30)
+    now = [1000.0]
+    monkeypatch.setattr(database.time, "monotonic", lambda: now[0])
+    replica.fail = True
+
+    assert database.read_connection() == "primary"
+    assert database.read_connection() == "primary"
+    assert replica.connects == 1
+
+    # Tried again once the backoff has passed
+    replica.fail = False
+    now[0] += 30
+    assert database.read_connection() == "replica"
+    assert replica.connects == 2